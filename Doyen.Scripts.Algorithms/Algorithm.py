@@ -142,6 +142,21 @@ class Algorithm:
             # Use the interface method which handles protobuf creation
             response = self.interface.subscribe_symbol(symbol, exchange, get_historical, depth_levels, candles_timeframe)
             return response
+        except Exception as e:
+            self.logger.error(f"Error subscribing to symbol: {e}")
+            return None
+
+    def subscribe_symbol_async(self, symbol: str, exchange: str, get_historical: bool = False, depth_levels: int = 10, candles_timeframe: int = 2):
+        """Subscribe to symbol data without waiting for the response
+
+        Returns a future resolving to the same dict as subscribe_symbol, so several
+        subscriptions can be in flight at once.
+        """
+        if not self.interface:
+            self.logger.error("Error: No interface connection available")
+            return None
+        try:
+            return self.interface.subscribe_symbol_async(symbol, exchange, get_historical, depth_levels, candles_timeframe)
         except Exception as e:
             self.logger.error(f"Error subscribing to symbol: {e}")
             return None
\ No newline at end of file
@@ -684,22 +684,43 @@ class AlgorithmInterface:
     def subscribe_symbol(self, symbol: str, exchange : str, get_historical: bool = False, depth_levels: int = 10, candles_timeframe = common_pb2.TIMEFRAME_FIVE_MINUTES):
         """Subscribe to symbol data - handles protobuf message creation internally"""
         try:
-            algo_exchange = self.get_algo_exchange(exchange)
-            request = algos_pb2.SymbolDataRequest(
-                algoId=self.algo_id,
-                symbol=symbol,
-                exchange=algo_exchange,
-                getHistorical=get_historical,
-                depthOfBookLevels=depth_levels,
-                candlesTimeframe=candles_timeframe
-            )
+            request = self.get_symbol_data_request(symbol, exchange, get_historical, depth_levels, candles_timeframe)
             # Call the servicer's SubscribeSymbol method directly
             response = self.client.SubscribeSymbol(request)
             return {"success": response.success, "reason": response.reason}
         except Exception as e:
             logger.error("Error subscribing to symbol: %s", e)
             return {"success": False, "reason": str(e)}
-    
+
+    def subscribe_symbol_async(self, symbol: str, exchange : str, get_historical: bool = False, depth_levels: int = 10, candles_timeframe = common_pb2.TIMEFRAME_FIVE_MINUTES):
+        """Subscribe to symbol data without blocking - returns a future resolving to the same dict as subscribe_symbol"""
+        result = futures.Future()
+        def on_done(call):
+            try:
+                response = call.result()
+                result.set_result({"success": response.success, "reason": response.reason})
+            except Exception as e:
+                logger.error("Error subscribing to symbol: %s", e)
+                result.set_result({"success": False, "reason": str(e)})
+        try:
+            request = self.get_symbol_data_request(symbol, exchange, get_historical, depth_levels, candles_timeframe)
+            self.client.SubscribeSymbol.future(request).add_done_callback(on_done)
+        except Exception as e:
+            logger.error("Error subscribing to symbol: %s", e)
+            result.set_result({"success": False, "reason": str(e)})
+        return result
+
+    def get_symbol_data_request(self, symbol: str, exchange: str, get_historical: bool, depth_levels: int, candles_timeframe):
+        """Build the SymbolDataRequest used by subscribe_symbol and subscribe_symbol_async"""
+        return algos_pb2.SymbolDataRequest(
+            algoId=self.algo_id,
+            symbol=symbol,
+            exchange=self.get_algo_exchange(exchange),
+            getHistorical=get_historical,
+            depthOfBookLevels=depth_levels,
+            candlesTimeframe=candles_timeframe
+        )
+
     def get_order_status(self, order_id: str, exchange: str, simulated: bool = False):
         """Get the current status of an order"""
         try:
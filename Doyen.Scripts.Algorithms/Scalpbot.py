@@ -1,10 +1,24 @@
-import datetime
 import json
+import time
+from enum import IntEnum
 from typing import Dict, List, Optional, Any
 from Algorithm import Algorithm
 import algos_pb2
 import algos_pb2_grpc
 
+class Action(IntEnum):
+    """Decision returned by ScalpBot.decide for each live book update"""
+    NONE = 0
+    OPEN = 1
+    CANCEL = 2
+
+class State(IntEnum):
+    """Lifecycle of ScalpBot's current order"""
+    IDLE = 0
+    AWAITING_OPEN = 1
+    OPEN = 2
+    AWAITING_CANCEL = 3
+
 class ScalpBot(Algorithm):
     """Spread trading bot using gRPC protocol."""
     def __init__(self):
@@ -14,10 +28,10 @@ class ScalpBot(Algorithm):
         self.order_quantity = 0.0
         self.order_ttk = 10
         self.current_order = None
-        self.dob = None
+        self._order_ts = None  # time.monotonic() when current_order was placed
+        self._top = None  # (best bid, best offer) of the latest book
         self.message_id = 0
-        self.awaiting_cancel = False
-        self.awaiting_open = False
+        self._state = State.IDLE
         self.existing_balance = 0.0
 
     def get_display_name(self) -> str:
@@ -42,9 +56,9 @@ class ScalpBot(Algorithm):
         self.order_quantity = 0.0
         self.order_ttk = 10
         self.current_order = None
-        self.dob = None
-        self.awaiting_cancel = False
-        self.awaiting_open = False
+        self._order_ts = None
+        self._top = None
+        self._state = State.IDLE
         self.existing_balance = 0.0
 
     def get_options_schema(self) -> str:
@@ -101,18 +115,28 @@ class ScalpBot(Algorithm):
         self.refresh()
         props = options['properties']
         self.symbol = props['symbol']['value']
-        self.exchanges = props['exchange']['value']        
+        exchanges = props['exchange']['value']
         self.order_ttk = props["order_ttk"]['value']
         self.order_quantity = props['order_quantity']['value']
         self.existing_balance = props['existing_balance']['value']
 
-        exchanges = self.exchanges.split(",") if isinstance(self.exchanges, str) else self.exchanges
-
-        for exchange in exchanges:
-            subscribe_result = self.subscribe_symbol(self.symbol, exchange, get_historical=True)
+        if isinstance(exchanges, str) and "," not in exchanges:
+            # Almost every configuration names a single exchange; subscribe to it directly
+            self.exchanges = (exchanges.strip(),)
+            subscribe_result = self.subscribe_symbol(self.symbol, self.exchanges[0], get_historical=True) or {}
             if not subscribe_result.get("success", False):
                 self.logger.error(f"Failed to subscribe symbol: {subscribe_result.get('reason', '')}")
                 return False
+            return True
+
+        self.exchanges = tuple(exchange.strip() for exchange in exchanges.split(",")) if isinstance(exchanges, str) else tuple(exchanges)
+        # Issue every subscription before waiting on any of them so they complete in parallel
+        pending = [self.subscribe_symbol_async(self.symbol, exchange, get_historical=True) for exchange in self.exchanges]
+        results = [future.result() if future else {} for future in pending]
+        if any(not result.get("success", False) for result in results):
+            reasons = ", ".join(result.get("reason", "") for result in results if not result.get("success", False))
+            self.logger.error(f"Failed to subscribe symbol: {reasons}")
+            return False
         return True
 
     def place_order(self, side: str, price: float, qty: Optional[float] = None):
@@ -122,23 +146,28 @@ class ScalpBot(Algorithm):
             return
         self.message_id += 1
         
-        exchange = self.exchanges[0] if isinstance(self.exchanges, list) else self.exchanges
         order_qty = qty if qty is not None else self.order_quantity
-        response = self.interface.send_order(self.symbol, exchange, price, order_qty, side, "limit", self.message_id)
-        if response is None:
-            self.logger.error(f"Failed to place {side} order at {price}: Paused or invalid state")
-        elif not response.result == 1:
-            self.logger.error(f"Failed to place {side} order at {price}: {response.reason}")
+        response = self.interface.send_order(self.symbol, self.exchanges[0], price, order_qty, side, "limit", self.message_id)
+        if response is None or not response.result == 1:
+            reason = "Paused or invalid state" if response is None else response.reason
+            self.logger.error(f"Failed to place {side} order at {price}: {reason}")
+            # Nothing was placed, so go back to IDLE and let the next live book retry
+            self.current_order = None
+            self._order_ts = None
+            self._state = State.IDLE
             return
-        self.current_order = { "id": response.orderId, "side": side, "price": price, "filled_quantity": 0, "quantity": self.order_quantity, "timestamp": datetime.datetime.utcnow()}
+        self.current_order = { "id": response.orderId, "message_id": self.message_id, "side": side, "price": price, "filled_quantity": 0, "quantity": self.order_quantity}
+        self._order_ts = time.monotonic()
+        # Orders are keyed by our own integer message id rather than the server-assigned order id string
+        self.orders[self.message_id] = self.current_order
         self.logger.info(f"Placing {side} order at {price} for {self.order_quantity} {self.symbol}")
-        self.awaiting_open = False
+        self._state = State.OPEN
 
     def on_order_partial_filled(self, order_id: str, filled_quantity: float, filled_price: float, side: str):
         self.existing_balance += filled_quantity if side == "buy_open" else -filled_quantity
         self.logger.info(f"Order {order_id} partially filled at {filled_price} for {filled_quantity} {self.symbol}")
         if side == "buy_open":
-            self.awaiting_cancel = True
+            self._state = State.AWAITING_CANCEL
             self.cancel_order(order_id)
 
     def on_order_filled(self, order_id: str, filled_quantity: float, filled_price: float, side: str):
@@ -146,47 +175,98 @@ class ScalpBot(Algorithm):
         self.existing_balance += filled_quantity if side == "buy_open" else -filled_quantity
         # When an order is filled, place a new order closing the existing balance or opening a new buy order
         self.current_order = None
-        self.awaiting_cancel = False
+        self._order_ts = None
+        self._state = State.IDLE
+
+    def on_order_cancelled(self, order_id: str, filled_quantity: float, filled_price: float, side: str):
+        self.logger.info(f"Order {order_id} canceled.")
+        self._state = State.IDLE
+        self.current_order = None
+        self._order_ts = None
+
+    def on_order_terminated(self, order_id: str, filled_quantity: float, filled_price: float, side: str):
+        self.logger.info(f"Order {order_id} was rejected or expired.")
+        self._state = State.IDLE
+        self.current_order = None
+        self._order_ts = None
+
+    # Order status -> handler method name, looked up once per update instead of an if/elif chain
+    _STATUS_HANDLERS = {
+        algos_pb2.OrderStatus.ORDER_STATUS_PARTIAL_FILLED: "on_order_partial_filled",
+        algos_pb2.OrderStatus.ORDER_STATUS_FILLED: "on_order_filled",
+        algos_pb2.OrderStatus.ORDER_STATUS_CANCELLED: "on_order_cancelled",
+        algos_pb2.OrderStatus.ORDER_STATUS_REJECTED: "on_order_terminated",
+        algos_pb2.OrderStatus.ORDER_STATUS_EXPIRED: "on_order_terminated",
+    }
+
+    # Statuses after which the server sends no more updates for an order
+    _TERMINAL_STATUSES = frozenset((
+        algos_pb2.OrderStatus.ORDER_STATUS_FILLED,
+        algos_pb2.OrderStatus.ORDER_STATUS_CANCELLED,
+        algos_pb2.OrderStatus.ORDER_STATUS_REJECTED,
+        algos_pb2.OrderStatus.ORDER_STATUS_EXPIRED,
+    ))
 
     def process_order_status(self, order_status):
         """Process order status updates"""
-        if self.current_order["id"] != order_status.orderId:
+        order = self.orders.get(order_status.messageId)
+        if order is None and self.current_order is not None and self.current_order["id"] == order_status.orderId:
+            # Updates caused by a cancel request carry that request's message id instead
+            order = self.current_order
+        if order is None:
+            return
+        if order_status.status in self._TERMINAL_STATUSES:
+            # Finished orders are dropped even if they are no longer current, so orders only holds live ones
+            self.orders.pop(order["message_id"], None)
+        if order is not self.current_order:
             return
         self.logger.info(f"Processing order status update: {order_status}")
-        if order_status.status == algos_pb2.OrderStatus.ORDER_STATUS_PARTIAL_FILLED:
-            self.on_order_partial_filled(order_status.orderId, order_status.filledQuantity, self.current_order["price"], self.current_order["side"])
-        if order_status.status == algos_pb2.OrderStatus.ORDER_STATUS_FILLED:
-            self.on_order_filled(order_status.orderId, order_status.filledQuantity, self.current_order["price"], self.current_order["side"])
-        elif order_status.status == algos_pb2.OrderStatus.ORDER_STATUS_CANCELLED:
-            self.logger.info(f"Order {order_status.orderId} canceled.")
-            self.awaiting_cancel = False
-            self.current_order = None
+        handler = self._STATUS_HANDLERS.get(order_status.status)
+        if handler:
+            getattr(self, handler)(order_status.orderId, order_status.filledQuantity, order["price"], order["side"])
 
     def open_new_order(self):
-        self.awaiting_open = True
+        self._state = State.AWAITING_OPEN
         self.logger.info(f"Opening new order. Existing balance: {self.existing_balance}")
         # If we have an existing balance, attempt to close it.
         if self.existing_balance > 0:
             # Place a sell order for the existing balance
-            self.place_order("sell_close", self.dob.offerLevels[0].price, self.existing_balance)
+            self.place_order("sell_close", self._top[1], self.existing_balance)
         else:
             # Place a buy order at the best bid level
-            self.place_order("buy_open", self.dob.bidLevels[0].price)
+            self.place_order("buy_open", self._top[0])
 
     def process_dob(self, book):
         super().process_dob(book)
-        self.dob = book
         # if we're through the historical data, we can start placing orders
         if book.historical == False:
-            self.logger.info("Processing live depth of book data")
-            self.logger.info(f"Current book: {book.symbol} on {book.exchange}: {book.bidLevels[0].price} / {book.offerLevels[0].price}")
-            self.logger.info(f"Awaiting Open: {self.awaiting_open}, Awaiting Cancel: {self.awaiting_cancel}, Current Order: {self.current_order}")
-            if not self.awaiting_open and not self.awaiting_cancel:
-                if self.current_order is None:
-                    self.open_new_order()
-                elif self.current_order["timestamp"] + datetime.timedelta(seconds=self.order_ttk) < datetime.datetime.utcnow():
-                    self.awaiting_cancel = True
-                    self.cancel_order(self.current_order["id"])
+            if not book.bidLevels or not book.offerLevels:
+                # No top of book to price an order from
+                return
+            # Only the top of book is used, so don't keep the whole depth message alive
+            self._top = (book.bidLevels[0].price, book.offerLevels[0].price)
+            self.logger.debug("Live book: %s on %s: %s / %s, State: %s, Current Order: %s",
+                              book.symbol, book.exchange, self._top[0], self._top[1],
+                              self._state.name, self.current_order)
+            action = self.decide(time.monotonic())
+            if action == Action.OPEN:
+                self.open_new_order()
+            elif action == Action.CANCEL:
+                self._state = State.AWAITING_CANCEL
+                self.cancel_order(self.current_order["id"])
+
+    def decide(self, now: float) -> Action:
+        """Decide what to do on a live book update. now is a time.monotonic() reading.
+
+        Only reads scalar state and never touches the book or the interface, so it can be
+        compiled (Cython/Numba) separately from the dispatch in process_dob.
+        """
+        state = self._state
+        if state is State.IDLE and self.current_order is None:
+            return Action.OPEN
+        if state is State.OPEN and now - self._order_ts > self.order_ttk:
+            return Action.CANCEL
+        return Action.NONE
 # Create an instance of the GridTrader algorithm
 # This allows the script to be run directly or imported without executing the algorithm
 indicator = ScalpBot()
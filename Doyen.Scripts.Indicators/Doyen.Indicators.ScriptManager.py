@@ -1,15 +1,24 @@
 import argparse
 import asyncio
 import grpc
+import importlib.util
 import os
 import sys
-import types
 import json
-import datetime
-import concurrent.futures
 import logging
 from concurrent import futures
-from google.protobuf.timestamp_pb2 import Timestamp
+
+# NumPy is optional; without it indicators always receive historical data as a list of dicts
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# orjson is optional and only used to parse indicator options faster; its decode errors subclass json.JSONDecodeError
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
 
 # Setup logging
 verbose = '--verbose' in sys.argv
@@ -42,59 +51,115 @@ try:
 except ImportError:
     logger.error("Error: Indicator base class not found. Make sure Indicator.py is in the same directory.")
 
-# Create a global event loop for each thread
-def get_or_create_event_loop():
-    try:
-        return asyncio.get_event_loop()
-    except RuntimeError:
-        # If there's no event loop in this thread, create one
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        return loop
+# Per-candle conversion helpers. A compiled _fast extension, if built, is imported in place of _fast.py.
+from _fast import candlestick_to_dict, datetime_to_timestamp, _indicator_data_fields
+
+# Loaded indicator modules: absolute path -> (mtime, module). A script is only re-executed when its file changes.
+_MODULE_CACHE = {}
+# Script directories already added to sys.path
+_SCRIPT_DIRS = set()
+# Scripts next to the manager that are not indicators and must not be imported by the startup scan
+_NON_INDICATOR_SCRIPTS = {os.path.splitext(os.path.basename(__file__))[0], 'Indicator', 'compile_proto'}
 
 class IndicatorContext:
     """Stores context for an active indicator"""
+    # Read on every ProcessData call; slots keep instances small and attribute access cheap
+    __slots__ = ('id', 'symbol', 'name', 'indicator', 'lock')
+
     def __init__(self, indicator_id, symbol, name, indicator=None):
         self.id = indicator_id
         self.symbol = symbol
         self.name = name
         self.indicator = indicator
+        # start() and process() run on worker threads; this keeps one indicator's calls serialized and in order
+        self.lock = asyncio.Lock()
 
-async def load_indicator_from_file(id, symbol, path):
-    """Load an indicator from a file"""
-    try:
-        # Get the module name from the file path
-        mod_name = os.path.basename(path).replace('.py', '')
-        
+def import_indicator_module(path):
+    """Import an indicator script, reusing the loaded module unless the file has changed.
+
+    Returns (module name, module).
+    """
+    # Get the module name from the file path
+    mod_name = os.path.basename(path).replace('.py', '')
+    abs_path = os.path.abspath(path)
+    mtime = os.path.getmtime(abs_path)
+    
+    cached = _MODULE_CACHE.get(abs_path)
+    if cached and cached[0] == mtime:
+        module = cached[1]
+    else:
         # Add the directory to the Python path
-        script_dir = os.path.dirname(path)
-        if script_dir not in sys.path:
-            sys.path.insert(0, script_dir)
+        script_dir = os.path.dirname(abs_path)
+        if script_dir not in _SCRIPT_DIRS:
+            _SCRIPT_DIRS.add(script_dir)
+            if script_dir not in sys.path:
+                sys.path.insert(0, script_dir)
         
         # Import the module
         try:
             # Try to import the module directly first
+            already_imported = mod_name in sys.modules
             module = __import__(mod_name)
             
-            # Reload to ensure we have the latest version
-            import importlib
-            module = importlib.reload(module)
+            # Reload only if the script was imported before and has changed since
+            if already_imported:
+                module = importlib.reload(module)
             
         except ImportError:
-            # If that fails, fall back to the old method of loading from file
+            # If that fails, load it straight from the file. Going through a real spec lets the
+            # import system cache the compiled bytecode in __pycache__ like any other import.
             logger.info(f"Loading module {mod_name} using file-based import")
-            module = types.ModuleType(mod_name)
-            
-            with open(path, 'r') as f:
-                code = f.read()
-            exec(code, module.__dict__)
+            spec = importlib.util.spec_from_file_location(mod_name, abs_path)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[mod_name] = module
+            try:
+                spec.loader.exec_module(module)
+            except BaseException:
+                del sys.modules[mod_name]
+                raise
+        _MODULE_CACHE[abs_path] = (mtime, module)
+    return mod_name, module
+
+def find_indicator_class(module):
+    """Return the Indicator subclass provided by a script module, or None"""
+    if isinstance(getattr(module, 'indicator', None), Indicator):
+        return type(module.indicator)
+    for cls in module.__dict__.values():
+        if isinstance(cls, type) and issubclass(cls, Indicator) and cls is not Indicator:
+            return cls
+    return None
+
+def scan_indicator_classes(directory):
+    """Import every indicator script in directory and return {script name: Indicator subclass}"""
+    classes = {}
+    for file_name in sorted(os.listdir(directory)):
+        name, ext = os.path.splitext(file_name)
+        # Skip non-scripts, private helpers, generated proto modules and anything that isn't an indicator
+        if ext != '.py' or name.startswith('_') or '_pb2' in name or name in _NON_INDICATOR_SCRIPTS:
+            continue
+        try:
+            _, module = import_indicator_module(os.path.join(directory, file_name))
+        except Exception as e:
+            logger.error(f"Error loading indicator script {file_name}: {e}", exc_info=True)
+            continue
+        cls = find_indicator_class(module)
+        if cls is not None:
+            classes[name] = cls
+    logger.info(f"Found indicators: {', '.join(classes)}")
+    return classes
+
+async def load_indicator_from_file(id, symbol, path):
+    """Load an indicator from a file"""
+    try:
+        mod_name, module = import_indicator_module(path)
         
         # Look for the indicator instance
         indicator = None
         
         # First try to get the predefined indicator instance
         if hasattr(module, 'indicator') and isinstance(module.indicator, Indicator):
-            indicator = module.indicator
+            # The module is shared between initializations, so each one gets its own instance
+            indicator = type(module.indicator)()
             indicator.id = id
             indicator.symbol = symbol
             logger.info(f"Found indicator instance in module {mod_name}")
@@ -139,10 +204,11 @@ async def load_indicator_from_file(id, symbol, path):
                     logger.info(f"Created function wrapper indicator for module {mod_name}")
         
         if indicator:
-            # Print available methods in the indicator for debugging
-            methods = [name for name, obj in indicator.__class__.__dict__.items() 
-                    if callable(obj) and not name.startswith('_')]
-            logger.info(f"Loaded indicator {mod_name} with methods: {', '.join(methods)}")
+            # List the indicator's methods for debugging, only when someone will see them
+            if logger.isEnabledFor(logging.DEBUG):
+                methods = [name for name, obj in indicator.__class__.__dict__.items() 
+                        if callable(obj) and not name.startswith('_')]
+                logger.debug(f"Loaded indicator {mod_name} with methods: {', '.join(methods)}")
 
             return indicator
         else:
@@ -152,72 +218,103 @@ async def load_indicator_from_file(id, symbol, path):
         logger.error(f"Error loading indicator from {path}: {e}", exc_info=True)
         return None
 
-def timestamp_to_datetime(timestamp):
-    """Convert protobuf Timestamp to Python datetime"""
-    return datetime.datetime.fromtimestamp(
-        timestamp.seconds + timestamp.nanos / 1e9, 
-        tz=datetime.timezone.utc
-    )
+def candlesticks_to_soa(cs_list):
+    """Convert protobuf DoyenCandlesticks to a dict of NumPy columns.
 
-def candlestick_to_dict(cs):
-    """Convert protobuf DoyenCandlestick to Python dict"""
+    Prices are float64 arrays; timestamp, start_time and end_time are int64 nanoseconds since the epoch.
+    """
+    count = len(cs_list)
     return {
-        'exchange': cs.exchange,
-        'timeframe': cs.timeframe,
-        'timestamp': timestamp_to_datetime(cs.timestamp),
-        'start_time': timestamp_to_datetime(cs.timeStart),
-        'end_time': timestamp_to_datetime(cs.timeEnd),
-        'open': cs.open,
-        'high': cs.high,
-        'low': cs.low,
-        'close': cs.close
+        'open': np.fromiter((cs.open for cs in cs_list), dtype=np.float64, count=count),
+        'high': np.fromiter((cs.high for cs in cs_list), dtype=np.float64, count=count),
+        'low': np.fromiter((cs.low for cs in cs_list), dtype=np.float64, count=count),
+        'close': np.fromiter((cs.close for cs in cs_list), dtype=np.float64, count=count),
+        'timestamp': np.fromiter((cs.timestamp.seconds * 1000000000 + cs.timestamp.nanos for cs in cs_list), dtype=np.int64, count=count),
+        'start_time': np.fromiter((cs.timeStart.seconds * 1000000000 + cs.timeStart.nanos for cs in cs_list), dtype=np.int64, count=count),
+        'end_time': np.fromiter((cs.timeEnd.seconds * 1000000000 + cs.timeEnd.nanos for cs in cs_list), dtype=np.int64, count=count)
     }
 
-def datetime_to_timestamp(dt):
-    """Convert Python datetime to protobuf Timestamp"""
-    timestamp = Timestamp()
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=datetime.timezone.utc)
-    timestamp.FromDatetime(dt)
-    return timestamp
+def find_script_path(name):
+    """Return the path of the indicator script for name, or None if it can't be found"""
+    script_path = f"{name}.py"
+    if os.path.exists(script_path):
+        return script_path
+    # Try in the current directory
+    script_path = os.path.join(current_dir, f"{name}.py")
+    if os.path.exists(script_path):
+        return script_path
+    return None
 
 class ChartsServicer(charts_pb2_grpc.ChartsServerServicer):
     """Implementation of the ChartsServer gRPC service"""
     def __init__(self):
         self.active_indicators = {}
+        # Same contexts indexed symbol -> id -> IndicatorContext, so ProcessData only visits the request's symbol
+        self.by_symbol = {}
+        # The server's event loop, captured once at startup instead of looked up on every call.
+        # The servicer is created inside that loop, alongside the grpc.aio server.
+        self.loop = asyncio.get_running_loop()
+        # Indicator start/process calls are user code and may be CPU heavy, so they run here rather than on the loop
+        self._cpu_pool = futures.ThreadPoolExecutor(max_workers=os.cpu_count())
+        # Indicator name -> resolved script path
+        self._script_path_cache = {}
+        # Indicator name -> class for every script next to the manager, imported once here at startup.
+        # Edits to these scripts take effect when the manager restarts.
+        self._indicator_classes = scan_indicator_classes(current_dir)
     
+    def _remove_indicator(self, indicator_id):
+        """Drop an indicator from active_indicators and by_symbol, if present"""
+        context_obj = self.active_indicators.pop(indicator_id, None)
+        if context_obj is not None:
+            symbol_indicators = self.by_symbol.get(context_obj.symbol)
+            if symbol_indicators is not None:
+                symbol_indicators.pop(indicator_id, None)
+                if not symbol_indicators:
+                    del self.by_symbol[context_obj.symbol]
+
     async def initialize_indicator_async(self, request, context):
         """Initialize an indicator script"""
         logger.info(f"Initializing indicator: {request.name} for {request.symbol} (ID: {request.id})")
         
         try:
-            # Find the script file
-            script_path = f"{request.name}.py"
-            if not os.path.exists(script_path):
-                # Try in the current directory
-                script_path = os.path.join(current_dir, f"{request.name}.py")
-                if not os.path.exists(script_path):
-                    logger.error(f"Indicator script not found: {request.name}.py")
+            indicator_class = self._indicator_classes.get(request.name)
+            if indicator_class is not None:
+                # Found by the startup scan: just create a fresh instance
+                indicator = indicator_class()
+                indicator.id = request.id
+                indicator.symbol = request.symbol
+            else:
+                # Find the script file, probing the filesystem off the event loop the first time a name is seen
+                script_path = self._script_path_cache.get(request.name)
+                if script_path is None:
+                    script_path = await asyncio.to_thread(find_script_path, request.name)
+                    if script_path is None:
+                        logger.error(f"Indicator script not found: {request.name}.py")
+                        return charts_pb2.InitializeIndicatorResponse(
+                            id=request.id,
+                            success=False,
+                            reason=f"Script not found: {request.name}.py",
+                            hasOptionsPanel=False
+                        )
+                    self._script_path_cache[request.name] = script_path
+                
+                # Load the indicator
+                indicator = await load_indicator_from_file(request.id, request.symbol, script_path)
+                if not indicator:
+                    # The script may have moved or been deleted; look it up again next time
+                    self._script_path_cache.pop(request.name, None)
+                    logger.error(f"Failed to load indicator: {request.name}")
                     return charts_pb2.InitializeIndicatorResponse(
                         id=request.id,
                         success=False,
-                        reason=f"Script not found: {request.name}.py",
+                        reason="Failed to load indicator",
                         hasOptionsPanel=False
                     )
-            
-            # Load the indicator
-            indicator = await load_indicator_from_file(request.id, request.symbol, script_path)
-            if not indicator:
-                logger.error(f"Failed to load indicator: {request.name}")
-                return charts_pb2.InitializeIndicatorResponse(
-                    id=request.id,
-                    success=False,
-                    reason="Failed to load indicator",
-                    hasOptionsPanel=False
-                )
             # Store the indicator context
             indicator_context = IndicatorContext(request.id, request.symbol, request.name, indicator)
+            self._remove_indicator(request.id)
             self.active_indicators[request.id] = indicator_context
+            self.by_symbol.setdefault(request.symbol, {})[request.id] = indicator_context
             logger.info(f"Indicator {request.name} initialized successfully with ID {request.id}")
             logger.info(f"Active indicators: {list(self.active_indicators.keys())}")
             
@@ -247,10 +344,9 @@ class ChartsServicer(charts_pb2_grpc.ChartsServerServicer):
                 hasOptionsPanel=False
             )
     
-    def InitializeIndicator(self, request, context):
+    async def InitializeIndicator(self, request, context):
         """gRPC handler for InitializeIndicator"""
-        loop = get_or_create_event_loop()
-        return loop.run_until_complete(self.initialize_indicator_async(request, context))
+        return await self.initialize_indicator_async(request, context)
     
     async def start_indicator_async(self, request, context):
         """Start an indicator with historical data and options"""
@@ -272,73 +368,42 @@ class ChartsServicer(charts_pb2_grpc.ChartsServerServicer):
             options = {}
             if request.optionsJsonDataResponse:
                 try:
-                    options = json.loads(request.optionsJsonDataResponse)
+                    options = json_loads(request.optionsJsonDataResponse)
                 except json.JSONDecodeError:
                     logger.error(f"Invalid options JSON: {request.optionsJsonDataResponse}")
             
-            # Convert historical data
-            historical_data = [candlestick_to_dict(cs) for cs in request.historicalData]
+            # Convert historical data. Indicators that opt in get NumPy columns instead of one dict per candle,
+            # or a one-shot iterator so the full list of dicts is never held at once.
+            if np is not None and getattr(indicator, 'prefers_soa', False):
+                historical_data = candlesticks_to_soa(request.historicalData)
+            elif getattr(indicator, 'prefers_iter', False):
+                historical_data = map(candlestick_to_dict, request.historicalData)
+            else:
+                historical_data = list(map(candlestick_to_dict, request.historicalData))
             
             # Start the indicator
             try:
-                success = indicator.start(historical_data, options)
-                if not success:
-                    return charts_pb2.StartIndicatorResponse(
-                        id=request.id,
-                        success=False,
-                        reason="Indicator start function returned failure"
-                    )
-                
-                processed_data = []
-                # Publish historical results if available
-                if hasattr(indicator, 'get_historical_results'):
-                    results = indicator.get_historical_results()
-                    logger.info(f"{request.id} indicator has {len(results)} historical results")
-                    index = 0;
-                    for result in results:
-                        if(index >= len(historical_data)):
-                            break
-                        indicator_data = charts_pb2.IndicatorData(
-                            label=result.get('label', ''),
-                            type=result.get('type', charts_pb2.IndicatorMessageType.MESSAGE_LINE),
-                            startTimestamp=datetime_to_timestamp(historical_data[index].get('start_time', datetime.datetime.now(datetime.timezone.utc))),
-                            endTimestamp=datetime_to_timestamp(historical_data[index].get('end_time', datetime.datetime.now(datetime.timezone.utc)))
+                # The results are read under the same lock, so a ProcessData arriving right after start()
+                # cannot change the last one while it is being serialized
+                async with context_obj.lock:
+                    success = await self.loop.run_in_executor(self._cpu_pool, indicator.start, historical_data, options)
+                    if not success:
+                        return charts_pb2.StartIndicatorResponse(
+                            id=request.id,
+                            success=False,
+                            reason="Indicator start function returned failure"
                         )
-                        
-                        # Set dataPointId if present
-                        if 'dataPointId' in result:
-                            indicator_data.dataPointId = result['dataPointId']
-
-                        # Set timestamp
-                        if 'timestamp' in result:
-                            if isinstance(result['timestamp'], datetime.datetime):
-                                indicator_data.timestamp.CopyFrom(datetime_to_timestamp(result['timestamp']))
-                            else:
-                                dt = datetime.datetime.fromtimestamp(result['timestamp'] / 1000, tz=datetime.timezone.utc)
-                                indicator_data.timestamp.CopyFrom(datetime_to_timestamp(dt))
-
-                        # Set RGB values
-                        if 'r' in result:
-                            indicator_data.r = result['r']
-                        if 'g' in result:
-                            indicator_data.g = result['g']
-                        if 'b' in result:
-                            indicator_data.b = result['b']
-
-                        # Set the appropriate message based on type
-                        if result.get('type') == charts_pb2.IndicatorMessageType.MESSAGE_LINE or result.get('type') == 2:
-                            indicator_data.lineMessage.value = float(result.get('value', 0))
-                        elif result.get('type') == charts_pb2.IndicatorMessageType.MESSAGE_CANDLESTICK or result.get('type') == 1:
-                            indicator_data.candlestickMessage.open = float(result.get('open', 0))
-                            indicator_data.candlestickMessage.high = float(result.get('high', 0))
-                            indicator_data.candlestickMessage.low = float(result.get('low', 0))
-                            indicator_data.candlestickMessage.close = float(result.get('close', 0))
-                        elif result.get('type') == charts_pb2.IndicatorMessageType.MESSAGE_BAR or result.get('type') == 3:
-                            indicator_data.barMessage.bottom = float(result.get('bottom', 0))
-                            indicator_data.barMessage.top = float(result.get('top', 0))
-                        
-                        index += 1
-                        processed_data.append(indicator_data)
+                    
+                    processed_data = []
+                    # Publish historical results if available
+                    if hasattr(indicator, 'get_historical_results'):
+                        results = indicator.get_historical_results()
+                        logger.info(f"{request.id} indicator has {len(results)} historical results")
+                        # zip stops at the shorter sequence, so extra results beyond the history are dropped.
+                        # Start/end times are taken straight from the request's protobuf timestamps.
+                        for result, candle in zip(results, request.historicalData):
+                            processed_data.append(charts_pb2.IndicatorData(
+                                **_indicator_data_fields(result, candle.timeStart, candle.timeEnd)))
             
             except Exception as e:
                 logger.error(f"Error starting indicator: {e}")
@@ -363,10 +428,9 @@ class ChartsServicer(charts_pb2_grpc.ChartsServerServicer):
                 reason=f"Error: {str(e)}"
             )
     
-    def StartIndicator(self, request, context):
+    async def StartIndicator(self, request, context):
         """gRPC handler for StartIndicator"""
-        loop = get_or_create_event_loop()
-        return loop.run_until_complete(self.start_indicator_async(request, context))
+        return await self.start_indicator_async(request, context)
     
     async def stop_indicator_async(self, request, context):
         """Stop an indicator"""
@@ -384,19 +448,21 @@ class ChartsServicer(charts_pb2_grpc.ChartsServerServicer):
             context_obj = self.active_indicators[request.id]
             indicator = context_obj.indicator
             
-            # Stop the indicator
-            try:
-                indicator.stop()
-            except Exception as e:
-                logger.error(f"Error stopping indicator: {e}")
-                return charts_pb2.StopIndicatorResponse(
-                    id=request.id,
-                    success=False,
-                    reason=f"Error in stop function: {str(e)}"
-                )
-            
-            # Remove the indicator from active indicators
-            del self.active_indicators[request.id]
+            # Stop the indicator under its lock, so stop() never resets state a worker thread is still updating
+            async with context_obj.lock:
+                try:
+                    indicator.stop()
+                except Exception as e:
+                    logger.error(f"Error stopping indicator: {e}")
+                    return charts_pb2.StopIndicatorResponse(
+                        id=request.id,
+                        success=False,
+                        reason=f"Error in stop function: {str(e)}"
+                    )
+                
+                # Remove the indicator from active indicators, unless it was re-initialized while waiting for the lock
+                if self.active_indicators.get(request.id) is context_obj:
+                    self._remove_indicator(request.id)
             
             return charts_pb2.StopIndicatorResponse(
                 id=request.id,
@@ -412,77 +478,35 @@ class ChartsServicer(charts_pb2_grpc.ChartsServerServicer):
                 reason=f"Error: {str(e)}"
             )
     
-    def StopIndicator(self, request, context):
+    async def StopIndicator(self, request, context):
         """gRPC handler for StopIndicator"""
-        loop = get_or_create_event_loop()
-        return loop.run_until_complete(self.stop_indicator_async(request, context))
+        return await self.stop_indicator_async(request, context)
     
     async def process_data_async(self, request, context, candlesticks, indicator):
         """Process new data with the indicator"""
-        logger.debug(f"Processing data for symbol: {request.symbol}")
-        
+        indicator_id = indicator.id
         try:
-            # Find any active indicator to process this data
-            if not self.active_indicators or indicator.indicator.symbol != request.symbol:
-                logger.debug("No active indicators to process data")
-                return charts_pb2.DataMessageResponse(
-                    id="",
-                    data=None
-                )
-            else:
-                logger.debug(f"Processing data with indicator {indicator.id} for symbol {request.symbol}")
+            # Runs for every candle: keep the arguments lazy so nothing is formatted unless DEBUG is on
+            logger.debug("Processing data with indicator %s for symbol %s", indicator_id, request.symbol)
             
             # Process the data with the indicator
             try:
-                result = indicator.indicator.process(candlesticks)
+                # Run the (CPU-bound) process call off the event loop so other indicators can proceed in parallel
+                async with indicator.lock:
+                    result = await self.loop.run_in_executor(self._cpu_pool, indicator.indicator.process, candlesticks)
                 
                 if result:
-                    # Create the response
+                    # Start/end times come from the most recent candle
+                    last = candlesticks[-1]
                     indicator_data = charts_pb2.IndicatorData(
-                        id=indicator.id,
-                        label=result.get('label', ''),
-                        type=result.get('type', charts_pb2.IndicatorMessageType.MESSAGE_LINE)
+                        id=indicator_id,
+                        **_indicator_data_fields(result,
+                                                 datetime_to_timestamp(last['start_time']),
+                                                 datetime_to_timestamp(last['end_time']))
                     )
-                    
-                    # Set dataPointId if present
-                    if 'dataPointId' in result:
-                        indicator_data.dataPointId = int(result['dataPointId'])
-                    
-                    # Set timestamp if provided
-                    if 'timestamp' in result:
-                        if isinstance(result['timestamp'], datetime.datetime):
-                            indicator_data.timestamp.CopyFrom(datetime_to_timestamp(result['timestamp']))
-                        else:
-                            # Assume timestamp is in milliseconds since epoch
-                            dt = datetime.datetime.fromtimestamp(result['timestamp'] / 1000, tz=datetime.timezone.utc)
-                            indicator_data.timestamp.CopyFrom(datetime_to_timestamp(dt))
-                    
-                    # Set RGB values if provided
-                    if 'r' in result:
-                        indicator_data.r = result['r']
-                    if 'g' in result:
-                        indicator_data.g = result['g']
-                    if 'b' in result:
-                        indicator_data.b = result['b']
-                    
-                    indicator_data.startTimestamp.CopyFrom(datetime_to_timestamp(candlesticks[-1].get('start_time', datetime.datetime.now(datetime.timezone.utc))))
-                    indicator_data.endTimestamp.CopyFrom(datetime_to_timestamp(candlesticks[-1].get('end_time', datetime.datetime.now(datetime.timezone.utc))))
-                    
-                    # Set the appropriate message based on type
-                    if result.get('type') == charts_pb2.IndicatorMessageType.MESSAGE_LINE or result.get('type') == 2:
-                        indicator_data.lineMessage.value = float(result.get('value', 0))
-                        logger.debug(f"Processed line message with value: {indicator_data.lineMessage.value}")
-                    elif result.get('type') == charts_pb2.IndicatorMessageType.MESSAGE_CANDLESTICK or result.get('type') == 1:
-                        indicator_data.candlestickMessage.open = float(result.get('open', 0))
-                        indicator_data.candlestickMessage.high = float(result.get('high', 0))
-                        indicator_data.candlestickMessage.low = float(result.get('low', 0))
-                        indicator_data.candlestickMessage.close = float(result.get('close', 0))
-                    elif result.get('type') == charts_pb2.IndicatorMessageType.MESSAGE_BAR or result.get('type') == 3:
-                        indicator_data.barMessage.bottom = float(result.get('bottom', 0))
-                        indicator_data.barMessage.top = float(result.get('top', 0))
 
                     return charts_pb2.DataMessageResponse(
-                        id=indicator.id,
+                        id=indicator_id,
                         data=indicator_data
                     )
 
@@ -491,7 +515,7 @@ class ChartsServicer(charts_pb2_grpc.ChartsServerServicer):
             
             # If we get here, we couldn't process the data
             return charts_pb2.DataMessageResponse(
-                id=indicator.id,
+                id=indicator_id,
                 data=None
             )
             
@@ -502,18 +526,23 @@ class ChartsServicer(charts_pb2_grpc.ChartsServerServicer):
                 data=None
             )
     
-    def ProcessData(self, request, context):
+    async def ProcessData(self, request, context):
         """gRPC handler for ProcessData"""
+        logger.debug("Processing data for symbol: %s", request.symbol)
         # Convert candlesticks
-        candlesticks = [candlestick_to_dict(cs) for cs in request.candlesticks]
+        candlesticks = list(map(candlestick_to_dict, request.candlesticks))
             
-        for indicator in self.active_indicators.values():
-            loop = get_or_create_event_loop()
-            yield loop.run_until_complete(self.process_data_async(request, context, candlesticks, indicator))
+        # Process every indicator concurrently and write each response as soon as it is ready.
+        # Writing directly (rather than yielding) lets the stream's flow control pace us.
+        pending = [self.process_data_async(request, context, candlesticks, indicator)
+                   for indicator in list(self.by_symbol.get(request.symbol, {}).values())]
+        for next_response in asyncio.as_completed(pending):
+            await context.write(await next_response)
 
 async def start_grpc_server(address):
     """Start the gRPC server"""
-    server = grpc.aio.server(futures.ThreadPoolExecutor(max_workers=10))
+    # Handlers are coroutines run on the server's event loop, so no worker thread pool is needed
+    server = grpc.aio.server()
     charts_pb2_grpc.add_ChartsServerServicer_to_server(ChartsServicer(), server)
     server_address = address
     server.add_insecure_port(server_address)
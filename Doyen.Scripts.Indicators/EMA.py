@@ -1,78 +1,83 @@
-import datetime
-from pickle import FALSE
-import statistics
 import json
 import logging
-from typing import Dict, List, Optional, Any, Tuple
-from Indicator import Indicator
+from typing import Dict, List, Any, Tuple
+from Indicator import CandleIndicator, IndicatorPoint, LineHistory
+from _ema_core import JIT_ENABLED, ema_step, ema_array, np
 
 logger = logging.getLogger(__name__)
 
-class EMAIndicator(Indicator):
+# Options panel schema. It never changes, so it is serialized once at import instead of per request
+_EMA_SCHEMA = json.dumps({
+    "title": "Exponential Moving Average",
+    "description": "Calculates the exponential moving average of closing prices",
+    "properties": {
+        "period": {
+            "title": "Period",
+            "description": "Number of periods to include in the moving average",
+            "type": "integer",
+            "options": "1 .. 200",
+            "value": 12
+        },
+        "smoothing":{
+            "title": "Smoothing",
+            "description": "Smoothing factor for EMA calculation",
+            "type": "integer",
+            "options": "1 .. 200",
+            "value": 2
+        },
+        "upColor": {
+            "title": "Up Color",
+            "description": "Color for price increases",
+            "type": "string",
+            "options": "R, G, B: (0..255, 0..255, 0..255)",
+            "value": "0, 255, 0"
+        },
+        "downColor": {
+            "title": "Down Color",
+            "description": "Color for price decreases",
+            "type": "string",
+            "options": "R, G, B: (0..255, 0..255, 0..255)",
+            "value": "255, 0, 0"
+        },
+        "defaultColor": {
+            "title": "Default Color",
+            "description": "Color for invalid data or data preceding sufficent data to calculate the EMA.",
+            "type": "string",
+            "options": "R, G, B: (0..255, 0..255, 0..255)",
+            "value": "128, 128, 255"
+        }
+    }
+})
+
+class EMAIndicator(CandleIndicator):
     """Exponential Moving Average indicator implementation"""
     
     def __init__(self):
         super().__init__("Exponential Moving Average (EMA)")
         self.ema_period = 30  # Default EMA period
         self.smoothing = 2  # Default smoothing factor
-        self.historical_prices = []  # Store historical closing prices
+        self.seed_prices = []  # Closes of the first ema_period bars, used to seed the EMA with their average
         self.up_color = (0, 255, 0)  # Default up color (green)
         self.down_color = (255, 0, 0) # Default down color (red)
         self.default_color = (128, 128, 255)
-        self.previous_ema = None
-        self.smoothing_const = None
+        self.previous_ema = None  # Most recent EMA value
+        self.bar_start_ema = None  # EMA of the last completed bar; intra-bar updates build on this
+        self.k = None  # Weight of the newest price, smoothing / (period + 1)
+        self.one_minus_k = None  # Weight of the previous EMA
+        self._set_label()
 
     def get_options_schema(self) -> str:
         """Return JSON schema for the options panel"""
-        schema = {
-            "title": "Exponential Moving Average",
-            "description": "Calculates the exponential moving average of closing prices",
-            "properties": {
-                "period": {
-                    "title": "Period",
-                    "description": "Number of periods to include in the moving average",
-                    "type": "integer",
-                    "options": "1 .. 200",
-                    "value": 12
-                },
-                "smoothing":{
-                    "title": "Smoothing",
-                    "description": "Smoothing factor for EMA calculation",
-                    "type": "integer",
-                    "options": "1 .. 200",
-                    "value": 2
-                },
-                "upColor": {
-                    "title": "Up Color",
-                    "description": "Color for price increases",
-                    "type": "string",
-                    "options": "R, G, B: (0..255, 0..255, 0..255)",
-                    "value": "0, 255, 0"
-                },
-                "downColor": {
-                    "title": "Down Color",
-                    "description": "Color for price decreases",
-                    "type": "string",
-                    "options": "R, G, B: (0..255, 0..255, 0..255)",
-                    "value": "255, 0, 0"
-                },
-                "defaultColor": {
-                    "title": "Default Color",
-                    "description": "Color for invalid data or data preceding sufficent data to calculate the EMA.",
-                    "type": "string",
-                    "options": "R, G, B: (0..255, 0..255, 0..255)",
-                    "value": "128, 128, 255"
-                }
-            }
-        }
-        return json.dumps(schema)
+        return _EMA_SCHEMA
 
     def start(self, historical_data: List[Dict], options: Dict[str, Any]) -> bool:
         """Initialize the indicator with historical data and options"""
         # Call the parent method to store data
         super().start(historical_data, options)
         
-        self.historical_prices = []
+        self.seed_prices = []
+        self.previous_ema = None
+        self.bar_start_ema = None
 
         props = options['properties']
         logger.info(f"EMA indicator started with properties: {props}")
@@ -81,105 +86,128 @@ class EMAIndicator(Indicator):
         self.up_color = self.parse_color(props['upColor']['value'])
         self.down_color = self.parse_color(props['downColor']['value'])
         self.default_color = self.parse_color(props['defaultColor']['value'])
-        self.smoothing_const = (1 - (self.smoothing / (self.ema_period + 1)))
+        # Both weights are fixed once the options are known
+        self.k = self.smoothing / (self.ema_period + 1)
+        self.one_minus_k = 1 - self.k
+        self._set_label()
 
-        # Process historical data
-        for candle in historical_data:
-            result = self.process([candle])
+        self.seed_history(historical_data)
         
         return True
 
+    def _set_label(self):
+        """Build the result label, which only changes with the options"""
+        self._label = f"EMA({self.ema_period})"
+
+    def _ema_series(self, closes: List[float]) -> List[float]:
+        """EMA value for every bar in closes, matching process(). Bars before the first full period keep their close."""
+        period = self.ema_period
+        k = self.k
+        one_minus_k = self.one_minus_k
+        values = closes[:period - 1]
+        if len(closes) >= period:
+            ema = sum(closes[:period]) / period
+            values.append(ema)
+            if JIT_ENABLED:
+                values.extend(ema_array(np.array(closes[period:], dtype=np.float64), k, ema).tolist())
+            else:
+                for price in closes[period:]:
+                    ema = price * k + ema * one_minus_k
+                    values.append(ema)
+        return values
+
+    def _seed(self, historical_data: List[Dict], keys: List[Tuple]) -> None:
+        timestamps = [candle['timestamp'] for candle in historical_data]
+        closes = [candle['close'] for candle in historical_data]
+        values = self._ema_series(closes)
+        period = self.ema_period
+        label = self._label
+        up_color, down_color, default_color = self.up_color, self.down_color, self.default_color
+
+        results = LineHistory()
+        previous = None
+        for i, (value, dt, key) in enumerate(zip(values, timestamps, keys)):
+            color = default_color
+            # Colours compare consecutive EMAs, so they start one bar after the first valid value
+            if i >= period:
+                if value > previous:
+                    color = up_color
+                elif value < previous:
+                    color = down_color
+            results.add(label, dt, value, color, key[0], key[1], i + 1)
+            previous = value
+
+        count = len(values)
+        self.historical_results = results
+        self.seed_prices = closes[:period]
+        self.previous_ema = values[-1] if count >= period else None
+        self.bar_start_ema = values[-2] if count - 1 >= period else None
+
     def stop(self):
         super().stop()
         """Cleanup resources"""
         logger.info("EMAIndicator stopped.")
 
-    def _calculate_ema(self) -> float:
-        """Calculate EMA values based on current prices"""
-        # Need at least ema_period prices to calculate EMA
-        historical_ema = 0
-        if self.previous_ema == None:
-            historical_ema = self.historical_prices[-1] * (1 - self.smoothing_const)
-        else:
-            historical_ema = self.previous_ema * (1 - self.smoothing_const)
-
-        logger.debug(f"Previous EMA: {self.previous_ema}, Historical EMA component: {historical_ema}, Smoothing Const: {self.smoothing_const}")
-        logger.debug(f"Latest Price: {self.historical_prices[-1]}, Latest EMA: {self.historical_prices[-1] * self.smoothing_const + historical_ema}")
-        
-        return self.historical_prices[-1] * self.smoothing_const + historical_ema
-               
-
-    def process(self, candles: List[Dict]) -> Optional[Dict]:
-        """Process new price data and return updated indicator values"""
-        if not candles or len(candles) == 0:
-            return None
-        
-        # Get the latest candlestick
-        latest_candle = candles[0]
+    def _process_candle(self, latest_candle: Dict) -> IndicatorPoint:
+        """Apply a single candle and return its result"""
         close_price = latest_candle['close']
+        period = self.ema_period
+        previous_ema = self.previous_ema
         
         valid_ema = True
         latest_ema = close_price
         color = self.default_color
 
-        # Keep only the needed history (ema_period + some extra)
-        max_history = max(self.ema_period * 3, 100)
-        if len(self.historical_prices) > max_history:
-            self.historical_prices = self.historical_prices[-max_history:]
-        elif len(self.historical_prices) < self.ema_period:
-            # Not enough data to calculate EMA
-            logger.warning(f"Not enough historical prices to calculate EMA. Need at least {self.ema_period} prices.")
-            valid_ema = False
-        
         # Get timestamp from the candle
-        dt = latest_candle['timestamp'] or datetime.datetime.now(datetime.timezone.utc)
+        dt = latest_candle['timestamp']
         
         last_datapoint_id = self.next_datapoint_id - 1
-        start_ts = latest_candle.get('start_time', dt)
-        end_ts = latest_candle.get('end_time', dt)
+        start_ts = latest_candle['start_time']
+        end_ts = latest_candle['end_time']
         datapoint_id = self.get_datapoint_id(start_ts, end_ts)
         
         newResult = last_datapoint_id != datapoint_id
         if newResult:
-            self.historical_prices.append(close_price)
-        else:
-            self.historical_prices[-1] = close_price  # Update the last price if same datapoint_id
-
-        if valid_ema:            
-            # Recalculate EMA
-            latest_ema = self._calculate_ema()
+            # The previous bar is complete, so its EMA is the base for every update to this one
+            self.bar_start_ema = previous_ema
+        bar_start_ema = self.bar_start_ema
+
+        if bar_start_ema is None:
+            # Still seeding: the first EMA is the simple average of the first ema_period closes
+            seed_prices = self.seed_prices
+            if newResult:
+                seed_prices.append(close_price)
+            elif seed_prices:
+                seed_prices[-1] = close_price  # Update the last price if same datapoint_id
+            if len(seed_prices) < period:
+                # Not enough data to calculate EMA
+                logger.debug("Not enough historical prices to calculate EMA. Need at least %s prices.", period)
+                valid_ema = False
+
+        if valid_ema:
+            if bar_start_ema is None:
+                latest_ema = sum(seed_prices) / period
+            else:
+                latest_ema = ema_step(close_price, bar_start_ema, self.k, self.one_minus_k)
             
-            if self.previous_ema != None:
-                if latest_ema > self.previous_ema:
-                    logger.debug(f"EMA increased from {self.previous_ema } to {latest_ema}")
+            if previous_ema is not None:
+                if latest_ema > previous_ema:
                     color = self.up_color
-                elif latest_ema < self.previous_ema:
-                    logger.debug(f"EMA decreased from {self.previous_ema } to {latest_ema}")
+                elif latest_ema < previous_ema:
                     color = self.down_color
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("EMA changed from %s to %s", previous_ema, latest_ema)
 
-            self.previous_ema  = latest_ema            
-            logger.debug(f"Calculated EMA: {latest_ema} for period {self.ema_period}")
+            self.previous_ema = latest_ema
+            logger.debug("Calculated EMA: %s for period %s", latest_ema, period)
 
         else:
-            logger.warning(f"Invalid EMA value. Default color and close price will be used.")
+            logger.debug("Invalid EMA value. Default color and close price will be used.")
 
         # Return the indicator data
-        result = {
-            'label': f"EMA({self.ema_period})",
-            'timestamp': dt,
-            'type': 2,  # LINE
-            'value': latest_ema,
-            'r': color[0],
-            'g': color[1],
-            'b': color[2],
-            'start_time': start_ts,
-            'end_time': end_ts,
-            'dataPointId': datapoint_id
-        }
-
-        if last_datapoint_id <= 0 or newResult or valid_ema:
-            self.historical_results.append(result)
-            logger.debug(f"New EMA result added: {result}")
+        result = IndicatorPoint(label=self._label, timestamp=dt, value=latest_ema,
+                                r=color[0], g=color[1], b=color[2],
+                                start_time=start_ts, end_time=end_ts, dataPointId=datapoint_id)
 
         return result
 # Create an instance of the indicator for the module
@@ -1,7 +1,10 @@
 import datetime
+import functools
+from array import array
 import json
+from dataclasses import dataclass
 from enum import IntEnum
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 
 class IndicatorType(IntEnum):
     UNKNOWN = 0
@@ -9,16 +12,214 @@ class IndicatorType(IntEnum):
     LINE = 2
     BAR = 3
 
+class _PointMapping:
+    """Dict-style read access to a point's fields, so code written against result dicts keeps working"""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.__slots__ else default
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+@dataclass(slots=True, kw_only=True)
+class IndicatorPoint(_PointMapping):
+    """A LINE result. Slotted, so it is cheaper to allocate than the equivalent dict."""
+    label: str
+    timestamp: datetime.datetime
+    type: int = IndicatorType.LINE.value
+    value: float
+    r: int
+    g: int
+    b: int
+    start_time: Optional[datetime.datetime] = None
+    end_time: Optional[datetime.datetime] = None
+    dataPointId: int
+
+@dataclass(slots=True, kw_only=True)
+class CandlestickPoint(_PointMapping):
+    """A CANDLESTICK result"""
+    label: str
+    timestamp: datetime.datetime
+    type: int = IndicatorType.CANDLESTICK.value
+    open: float
+    high: float
+    low: float
+    close: float
+    r: int
+    g: int
+    b: int
+    start_time: Optional[datetime.datetime] = None
+    end_time: Optional[datetime.datetime] = None
+    dataPointId: int
+
+@dataclass(slots=True, kw_only=True)
+class BarPoint(_PointMapping):
+    """A BAR result"""
+    label: str
+    timestamp: datetime.datetime
+    type: int = IndicatorType.BAR.value
+    bottom: float
+    top: float
+    r: int
+    g: int
+    b: int
+    start_time: Optional[datetime.datetime] = None
+    end_time: Optional[datetime.datetime] = None
+    dataPointId: int
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+_MICROSECOND = datetime.timedelta(microseconds=1)
+
+def _to_epoch_us(dt: datetime.datetime) -> int:
+    # Naive datetimes are taken as UTC, as datetime_to_timestamp does when results are published
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return (dt - _EPOCH) // _MICROSECOND
+
+def _from_epoch_us(us: int) -> datetime.datetime:
+    return _EPOCH + datetime.timedelta(microseconds=us)
+
+class LineHistory:
+    """historical_results for LINE indicators, kept as parallel columns instead of one point per bar.
+
+    A row costs a few dozen bytes of array storage rather than a point object and its three datetimes.
+    Indexing and iteration rebuild IndicatorPoints, so callers can treat it as a list of points;
+    hot paths read the columns (values, data_point_ids) directly. Times are stored as UTC
+    microseconds since the epoch and come back as UTC datetimes.
+    """
+    __slots__ = ('labels', 'timestamps', 'values', 'r', 'g', 'b', 'start_times', 'end_times', 'data_point_ids')
+
+    def __init__(self, points=()):
+        self.labels = []
+        self.timestamps = array('q')
+        self.values = array('d')
+        # Colors come from options unchecked, so they get the full int32 range of IndicatorData's r, g and b
+        self.r = array('i')
+        self.g = array('i')
+        self.b = array('i')
+        self.start_times = array('q')
+        self.end_times = array('q')
+        self.data_point_ids = array('q')
+        self.extend(points)
+
+    def add(self, label: str, timestamp, value: float, color: Tuple[int, int, int], start_time, end_time, data_point_id: int):
+        """Append a row without building an IndicatorPoint first"""
+        self.labels.append(label)
+        self.timestamps.append(_to_epoch_us(timestamp))
+        self.values.append(value)
+        self.r.append(color[0])
+        self.g.append(color[1])
+        self.b.append(color[2])
+        self.start_times.append(_to_epoch_us(start_time))
+        self.end_times.append(_to_epoch_us(end_time))
+        self.data_point_ids.append(data_point_id)
+
+    def append(self, point: IndicatorPoint):
+        self.add(point.label, point.timestamp, point.value, (point.r, point.g, point.b),
+                 point.start_time, point.end_time, point.dataPointId)
+
+    def extend(self, points):
+        for point in points:
+            self.append(point)
+
+    def update_last(self, value: float, color: Tuple[int, int, int], timestamp):
+        """Overwrite the last row for an intra-bar update.
+
+        Only the columns that can change within a bar are written; the label, bar times and
+        datapoint id stay as they are.
+        """
+        self.values[-1] = value
+        self.r[-1] = color[0]
+        self.g[-1] = color[1]
+        self.b[-1] = color[2]
+        self.timestamps[-1] = _to_epoch_us(timestamp)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return IndicatorPoint(label=self.labels[index], timestamp=_from_epoch_us(self.timestamps[index]),
+                              value=self.values[index], r=self.r[index], g=self.g[index], b=self.b[index],
+                              start_time=_from_epoch_us(self.start_times[index]),
+                              end_time=_from_epoch_us(self.end_times[index]),
+                              dataPointId=self.data_point_ids[index])
+
+    def __setitem__(self, index: int, point: IndicatorPoint):
+        self.labels[index] = point.label
+        self.timestamps[index] = _to_epoch_us(point.timestamp)
+        self.values[index] = point.value
+        self.r[index] = point.r
+        self.g[index] = point.g
+        self.b[index] = point.b
+        self.start_times[index] = _to_epoch_us(point.start_time)
+        self.end_times[index] = _to_epoch_us(point.end_time)
+        self.data_point_ids[index] = point.dataPointId
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+def band_color(upper_band: float, lower_band: float, upper_color: Tuple[int, int, int],
+               lower_color: Tuple[int, int, int], default_color: Tuple[int, int, int]):
+    """Color function for oscillators: upper_color at or above upper_band, lower_color at or below lower_band"""
+    def value_color(value: float) -> Tuple[int, int, int]:
+        if value >= upper_band:
+            return upper_color
+        if value <= lower_band:
+            return lower_color
+        return default_color
+    return value_color
+
+@functools.lru_cache(maxsize=256)
+def _parse_color_str(color_val: str):
+    """Parse a '#rrggbb' or 'r, g, b' color string. Cached, since options reuse a handful of colors."""
+    color_val = color_val.strip()
+    if color_val.startswith('#'):
+        # Hex string
+        color_val = color_val.lstrip('#')
+        lv = len(color_val)
+        if lv == 6:
+            return tuple(int(color_val[i:i+2], 16) for i in (0, 2, 4))
+    elif ',' in color_val:
+        # Comma-separated string
+        parts = color_val.split(',')
+        if len(parts) == 3:
+            return tuple(int(float(p.strip())) for p in parts)
+    # Fallback to green
+    return (0, 255, 0)
+
 class Indicator:
     """Base class for all indicators"""
+    # Set to True to receive start()'s historical_data as a dict of NumPy columns
+    # ('open', 'high', 'low', 'close' as float64; 'timestamp', 'start_time', 'end_time' as int64 ns)
+    # instead of a list of candle dicts. Requires NumPy in the script environment.
+    prefers_soa = False
+    # Set to True to receive start()'s historical_data as an iterator of candle dicts, converted lazily.
+    # It can be consumed only once and is only valid during start(), so don't keep a reference to it.
+    prefers_iter = False
+    # Container for historical_results. LINE indicators use LineHistory; anything with append,
+    # item access, len and iteration will do.
+    history_class = list
+
     def __init__(self, name: str = ""):
         self.id = "default"
         self.symbol = "default"
         self.name = name
         self.options = {}
         self.historical_data = []
-        self.historical_results = []
-        self.datapoint_ids = {}  # (start, end) -> id
+        self.historical_results = self.history_class()
+        self.last_datapoint_key = None  # (start, end) of the most recent bar
         self.next_datapoint_id = 1
 
     def get_options_schema(self) -> str:
@@ -30,20 +231,21 @@ class Indicator:
         return json.dumps(schema)
 
     def start(self, historical_data: List[Dict], options: Dict[str, Any]) -> bool:
-        self.historical_data = historical_data
+        # An iterator is consumed by seeding and only valid during start(), so it is not kept
+        self.historical_data = None if self.prefers_iter else historical_data
         self.options = options
 
         # Initialize historical results and datapoint tracking
-        self.historical_results = []
-        self.datapoint_ids = {}
+        self.historical_results = self.history_class()
+        self.last_datapoint_key = None
         self.next_datapoint_id = 1
 
         return True
 
     def stop(self):
-        self.historical_results = []
+        self.historical_results = self.history_class()
         self.last_processed_time = None
-        self.datapoint_ids = {}
+        self.last_datapoint_key = None
 
     def process(self, candles: List[Dict]) -> Optional[Dict]:
         return None
@@ -51,28 +253,153 @@ class Indicator:
     def get_historical_results(self) -> List[Dict]:
         return self.historical_results
 
+    def base_process(self, candles: List[Dict], kernel_fn) -> Optional[IndicatorPoint]:
+        """process() for LINE indicators that produce one value per candle.
+
+        Candles are applied oldest first and the result for the last one is returned, as in EMA.process().
+        kernel_fn(candle, datapoint_id, new_bar) applies a candle to the indicator's state and returns
+        its value, or None while there is not enough data. A valid value is coloured by _value_color()
+        once there is an earlier result; otherwise the result carries _placeholder_value() in the default
+        color. Each bar's first result is kept in historical_results, as is every placeholder.
+        """
+        if not candles:
+            return None
+
+        results = self.historical_results
+        value_color = self._value_color
+        default_color = self.default_color
+        have_results = len(results) > 0
+        for candle in candles:
+            last_datapoint_id = self.next_datapoint_id - 1
+            start_ts = candle['start_time']
+            end_ts = candle['end_time']
+            datapoint_id = self.get_datapoint_id(start_ts, end_ts)
+            new_bar = last_datapoint_id != datapoint_id
+
+            value = kernel_fn(candle, datapoint_id, new_bar)
+            color = default_color
+            valid = value is not None
+            if not valid:
+                value = self._placeholder_value(candle)
+            elif have_results:
+                color = value_color(value)
+
+            result = IndicatorPoint(label=self._label, timestamp=candle['timestamp'], value=value,
+                                    r=color[0], g=color[1], b=color[2],
+                                    start_time=start_ts, end_time=end_ts, dataPointId=datapoint_id)
+
+            if last_datapoint_id <= 0 or new_bar or not valid:
+                results.append(result)
+                have_results = True
+
+        return result
+
+    def _placeholder_value(self, candle: Dict) -> float:
+        """Value shown while base_process() has no valid value; the candle's close by default"""
+        return candle['close']
+
+    def _value_color(self, value: float) -> Tuple[int, int, int]:
+        """Color of a valid base_process() value.
+
+        Indicators whose coloring depends only on the options can instead bind a function of the
+        value to self._value_color in start(), so nothing is read from self per candle.
+        """
+        return self.default_color
+
     def get_datapoint_id(self, start, end):
+        # Candles arrive in time order, so a bar is new whenever it differs from the previous one.
+        # Only the latest bar is remembered rather than every bar seen this session.
         key = (start, end)
-        if key not in self.datapoint_ids:
-            self.datapoint_ids[key] = self.next_datapoint_id
+        if key != self.last_datapoint_key:
+            self.last_datapoint_key = key
             self.next_datapoint_id += 1
-        return self.datapoint_ids[key]
+        return self.next_datapoint_id - 1
+
+    def seed_history(self, historical_data) -> None:
+        """Build historical_results and live state from start()'s candles.
+
+        When every candle is a new bar the indicator seeds itself in one pass with _seed(candles, keys);
+        otherwise, some candles being intra-bar updates, they are replayed through _replay().
+        """
+        historical_data = list(historical_data)
+        keys = self.bar_keys(historical_data)
+        if keys is None:
+            self._replay(historical_data)
+        else:
+            self._seed(historical_data, keys)
+            # Leave the datapoint tracking where process() would have after the last candle
+            self.last_datapoint_key = keys[-1] if keys else None
+            self.next_datapoint_id = len(keys) + 1
+
+    def _seed(self, historical_data: List[Dict], keys: List[Tuple]) -> None:
+        """Build historical_results and live state for candles that are all distinct bars.
+
+        keys are the candles' (start, end) bar keys, one per candle and none repeated. The candle at
+        position i is datapoint i + 1. An override computes the whole run in one pass, sets
+        historical_results to one result per candle and leaves the indicator's own state as process()
+        would after the last candle; seed_history() sets the datapoint tracking afterwards.
+        Indicators without a one-pass seed replay the candles.
+        """
+        self._replay(historical_data)
+
+    def _replay(self, historical_data: List[Dict]) -> None:
+        """Apply the candles one at a time through process().
+
+        Start pairs results with candles by position, so indicators whose process() does not record
+        one result per candle override this.
+        """
+        for candle in historical_data:
+            self.process([candle])
+
+    def bar_keys(self, candles: List[Dict]) -> Optional[List[Tuple]]:
+        """(start, end) of each candle, or None if two consecutive candles share a bar.
+
+        Indicators seed their history in one pass when every historical candle is a new bar.
+        """
+        keys = [(candle['start_time'], candle['end_time']) for candle in candles]
+        if any(key == next_key for key, next_key in zip(keys, keys[1:])):
+            return None
+        return keys
 
     def parse_color(self, color_val):
         if isinstance(color_val, tuple) and len(color_val) == 3:
             return color_val
         if isinstance(color_val, str):
-            color_val = color_val.strip()
-            if color_val.startswith('#'):
-                # Hex string
-                color_val = color_val.lstrip('#')
-                lv = len(color_val)
-                if lv == 6:
-                    return tuple(int(color_val[i:i+2], 16) for i in (0, 2, 4))
-            elif ',' in color_val:
-                # Comma-separated string
-                parts = color_val.split(',')
-                if len(parts) == 3:
-                    return tuple(int(float(p.strip())) for p in parts)
+            return _parse_color_str(color_val)
         # Fallback to green/red
-        return (0, 255, 0)
\ No newline at end of file
+        return (0, 255, 0)
+
+class CandleIndicator(Indicator):
+    """Base for indicators that build each result from a single candle with _process_candle().
+
+    process() keeps the latest result of each bar in historical_results, and replaying history
+    records one result per candle.
+    """
+    history_class = LineHistory
+
+    def process(self, candles: List[Dict]) -> Optional[IndicatorPoint]:
+        """Process new price data and return updated indicator values.
+
+        Candles are applied oldest first, so a client catching up can send several in one call;
+        the result for the last one is returned.
+        """
+        if not candles:
+            return None
+        process_candle = self._process_candle
+        results = self.historical_results
+        for candle in candles:
+            result = process_candle(candle)
+            if results and results.data_point_ids[-1] == result.dataPointId:
+                # Intra-bar update: only the latest result for each bar is kept
+                results.update_last(result.value, (result.r, result.g, result.b), result.timestamp)
+            else:
+                results.append(result)
+        return result
+
+    def _replay(self, historical_data: List[Dict]) -> None:
+        """One result per candle, where process() keeps only the latest result of each bar"""
+        self.historical_results.extend(self._process_candle(candle) for candle in historical_data)
+
+    def _process_candle(self, candle: Dict):
+        """Apply a single candle and return its result"""
+        raise NotImplementedError
@@ -1,88 +1,96 @@
-import datetime
-from pickle import FALSE
-import statistics
 import json
 import logging
-from typing import Dict, List, Optional, Any, Tuple
-from Indicator import Indicator
+from typing import Dict, List, Any, Tuple
+from Indicator import CandleIndicator, IndicatorPoint, LineHistory
+from _ema_core import macd_step
 
 logger = logging.getLogger(__name__)
 
-class EMAIndicator(Indicator):
+_MACD_SCHEMA = json.dumps({
+    "title": "MACD",
+    "description": "Calculates the Moving Average Convergence Divergence (MACD) of closing prices",
+    "properties": {
+        "fastPeriod": {
+            "title": "Fast EMA Period",
+            "description": "Number of periods for the fast EMA",
+            "type": "integer",
+            "options": "1 .. 200",
+            "value": 12
+        },
+        "slowPeriod": {
+            "title": "Slow EMA Period",
+            "description": "Number of periods for the slow EMA",
+            "type": "integer",
+            "options": "1 .. 200",
+            "value": 26
+        },
+        "smoothing": {
+            "title": "Smoothing",
+            "description": "Smoothing factor for EMA calculation",
+            "type": "integer",
+            "options": "1 .. 200",
+            "value": 2
+        },
+        "upColor": {
+            "title": "Up Color",
+            "description": "Color for price increases",
+            "type": "string",
+            "options": "R, G, B: (0..255, 0..255, 0..255)",
+            "value": "0, 255, 0"
+        },
+        "downColor": {
+            "title": "Down Color",
+            "description": "Color for price decreases",
+            "type": "string",
+            "options": "R, G, B: (0..255, 0..255, 0..255)",
+            "value": "255, 0, 0"
+        },
+        "defaultColor": {
+            "title": "Default Color",
+            "description": "Color for invalid data or data preceding sufficent data to calculate the EMA.",
+            "type": "string",
+            "options": "R, G, B: (0..255, 0..255, 0..255)",
+            "value": "128, 128, 255"
+        }
+    }
+})
+
+class MACDIndicator(CandleIndicator):
     """MACD indicator implementation"""
     
     def __init__(self):
-        super().__init__("Exponential Moving Average (EMA)")
+        super().__init__("Moving Average Convergence Divergence (MACD)")
         self.fast_ema_period = 12  # Default Fast EMA period
         self.slow_ema_period = 26  # Default Slow EMA period
         self.smoothing = 2  # Default smoothing factor
-        self.historical_prices = []  # Store historical closing prices
         self.up_color = (0, 255, 0)  # Default up color (green)
         self.down_color = (255, 0, 0) # Default down color (red)
         self.default_color = (128, 128, 255)
-        self.previous_fast_ema = None
-        self.previous_slow_ema = None
-        self.fast_smoothing_const = None
-        self.slow_smoothing_const = None
+        self.previous_fast_ema = None  # Most recent fast EMA
+        self.previous_slow_ema = None  # Most recent slow EMA
+        self.bar_start_fast_ema = None  # EMAs of the last completed bar; intra-bar updates build on these
+        self.bar_start_slow_ema = None
+        self.previous_macd = None  # Most recent MACD value, used for the up/down colour
+        self.fast_alpha = None
+        self.fast_one_minus_alpha = None
+        self.slow_alpha = None
+        self.slow_one_minus_alpha = None
+        self._set_label()
 
     def get_options_schema(self) -> str:
         """Return JSON schema for the options panel"""
-        schema = {
-            "title": "MACD",
-            "description": "Calculates the Moving Average Convergence Divergence (MACD) of closing prices",
-            "properties": {
-                "fastPeriod": {
-                    "title": "Fast EMA Period",
-                    "description": "Number of periods for the fast EMA",
-                    "type": "integer",
-                    "options": "1 .. 200",
-                    "value": 12
-                },
-                "slowPeriod": {
-                    "title": "Slow EMA Period",
-                    "description": "Number of periods for the slow EMA",
-                    "type": "integer",
-                    "options": "1 .. 200",
-                    "value": 26
-                },
-                "smoothing": {
-                    "title": "Smoothing",
-                    "description": "Smoothing factor for EMA calculation",
-                    "type": "integer",
-                    "options": "1 .. 200",
-                    "value": 2
-                },
-                "upColor": {
-                    "title": "Up Color",
-                    "description": "Color for price increases",
-                    "type": "string",
-                    "options": "R, G, B: (0..255, 0..255, 0..255)",
-                    "value": "0, 255, 0"
-                },
-                "downColor": {
-                    "title": "Down Color",
-                    "description": "Color for price decreases",
-                    "type": "string",
-                    "options": "R, G, B: (0..255, 0..255, 0..255)",
-                    "value": "255, 0, 0"
-                },
-                "defaultColor": {
-                    "title": "Default Color",
-                    "description": "Color for invalid data or data preceding sufficent data to calculate the EMA.",
-                    "type": "string",
-                    "options": "R, G, B: (0..255, 0..255, 0..255)",
-                    "value": "128, 128, 255"
-                }
-            }
-        }
-        return json.dumps(schema)
+        return _MACD_SCHEMA
 
     def start(self, historical_data: List[Dict], options: Dict[str, Any]) -> bool:
         """Initialize the indicator with historical data and options"""
         # Call the parent method to store data
         super().start(historical_data, options)
         
-        self.historical_prices = []
+        self.previous_fast_ema = None
+        self.previous_slow_ema = None
+        self.bar_start_fast_ema = None
+        self.bar_start_slow_ema = None
+        self.previous_macd = None
 
         props = options['properties']
         logger.info(f"MACD indicator started with properties: {props}")
@@ -92,119 +100,148 @@ class EMAIndicator(Indicator):
         self.up_color = self.parse_color(props['upColor']['value'])
         self.down_color = self.parse_color(props['downColor']['value'])
         self.default_color = self.parse_color(props['defaultColor']['value'])
-        self.fast_smoothing_const = (1 - (self.smoothing / (self.fast_ema_period + 1)))
-        self.slow_smoothing_const = (1 - (self.smoothing / (self.slow_ema_period + 1)))
-
-        # Process historical data
-        for candle in historical_data:
-            result = self.process([candle])
+        # Weight of the newest price in each EMA, and of the previous EMA
+        self.fast_alpha = self.smoothing / (self.fast_ema_period + 1)
+        self.fast_one_minus_alpha = 1 - self.fast_alpha
+        self.slow_alpha = self.smoothing / (self.slow_ema_period + 1)
+        self.slow_one_minus_alpha = 1 - self.slow_alpha
+        self._set_label()
+
+        self.seed_history(historical_data)
         
         return True
 
+    def _set_label(self):
+        """Build the result label, which only changes with the options"""
+        self._label = f"MACD({self.fast_ema_period}-{self.slow_ema_period})"
+
     def stop(self):
         super().stop()
         """Cleanup resources"""
         logger.info("MACDIndicator stopped.")
 
-    def _calculate_macd(self) -> float:
-        """Calculate MACD values based on current prices"""
-        fast_historical_ema = 0
-        if self.previous_ema == None:
-            fast_historical_ema = self.historical_prices[-1] * (1 - self.fast_smoothing_const)
-        else:
-            fast_historical_ema = self.previous_fast_ema * (1 - self.fast_smoothing_const)
-
-        self.previous_fast_ema = fast_ema        
-        fast_ema = self.historical_prices[-1] * self.fast_smoothing_const + fast_historical_ema
-        
-        slow_historical_ema = 0
-        if self.previous_ema == None:
-            slow_historical_ema = self.historical_prices[-1] * (1 - self.slow_smoothing_const)
-        else:
-            slow_historical_ema = self.previous_slow_ema * (1 - self.slow_smoothing_const)
-
-        self.previous_slow_ema = slow_ema        
-        slow_ema = self.historical_prices[-1] * self.slow_smoothing_const + slow_historical_ema
-
-
-        return fast_ema - slow_ema
-               
-
-    def process(self, candles: List[Dict]) -> Optional[Dict]:
-        """Process new price data and return updated indicator values"""
-        if not candles or len(candles) == 0:
-            return None
-        
-        # Get the latest candlestick
-        latest_candle = candles[0]
+    def _macd_series(self, closes: List[float]) -> Tuple[List[float], List[float], List[float]]:
+        """MACD, fast EMA and slow EMA for every bar in closes, matching process().
+
+        Bars up to slow_ema_period keep their close as the MACD value and have no EMAs.
+        """
+        period = self.slow_ema_period
+        fast_alpha, fast_one_minus_alpha = self.fast_alpha, self.fast_one_minus_alpha
+        slow_alpha, slow_one_minus_alpha = self.slow_alpha, self.slow_one_minus_alpha
+        values = closes[:period]
+        fast_values = []
+        slow_values = []
+        if len(closes) > period:
+            # Both EMAs start from the first valid close
+            fast = slow = closes[period]
+            for price in closes[period:]:
+                fast, slow = macd_step(price, fast, slow, fast_alpha, fast_one_minus_alpha, slow_alpha, slow_one_minus_alpha)
+                fast_values.append(fast)
+                slow_values.append(slow)
+                values.append(fast - slow)
+        return values, fast_values, slow_values
+
+    def _seed(self, historical_data: List[Dict], keys: List[Tuple]) -> None:
+        timestamps = [candle['timestamp'] for candle in historical_data]
+        closes = [candle['close'] for candle in historical_data]
+        values, fast_values, slow_values = self._macd_series(closes)
+        period = self.slow_ema_period
+        label = self._label
+        up_color, down_color, default_color = self.up_color, self.down_color, self.default_color
+
+        results = LineHistory()
+        previous = None
+        for i, (value, dt, key) in enumerate(zip(values, timestamps, keys)):
+            color = default_color
+            # Colours compare consecutive MACD values, so they start one bar after the first valid value
+            if i > period:
+                if value > previous:
+                    color = up_color
+                elif value < previous:
+                    color = down_color
+            results.add(label, dt, value, color, key[0], key[1], i + 1)
+            previous = value
+
+        self.historical_results = results
+        if fast_values:
+            self.previous_fast_ema = fast_values[-1]
+            self.previous_slow_ema = slow_values[-1]
+            self.previous_macd = values[-1]
+        if len(fast_values) > 1:
+            self.bar_start_fast_ema = fast_values[-2]
+            self.bar_start_slow_ema = slow_values[-2]
+
+    def _calculate_macd(self, price: float) -> float:
+        """Advance both EMAs from the last completed bar by a bar closing at price and return fast - slow"""
+        pf = self.bar_start_fast_ema
+        ps = self.bar_start_slow_ema
+        if pf is None:
+            pf = price
+        if ps is None:
+            ps = price
+        fast, slow = macd_step(price, pf, ps,
+                               self.fast_alpha, self.fast_one_minus_alpha,
+                               self.slow_alpha, self.slow_one_minus_alpha)
+        self.previous_fast_ema = fast
+        self.previous_slow_ema = slow
+        return fast - slow
+
+    def _process_candle(self, latest_candle: Dict) -> IndicatorPoint:
+        """Apply a single candle and return its result"""
         close_price = latest_candle['close']
+        period = self.slow_ema_period
+        previous_macd = self.previous_macd
         
         valid_ema = True
         latest_ema = close_price
         color = self.default_color
 
-        # Keep only the needed history (ema_period + some extra)
-        max_history = max(self.slow_ema_period * 3, 100)
-        if len(self.historical_prices) > max_history:
-            self.historical_prices = self.historical_prices[-max_history:]
-        elif len(self.historical_prices) < self.slow_ema_period:
-            # Not enough data to calculate EMA
-            logger.warning(f"Not enough historical prices to calculate EMA. Need at least {self.slow_ema_period} prices.")
-            valid_ema = False
-        
         # Get timestamp from the candle
-        dt = latest_candle['timestamp'] or datetime.datetime.now(datetime.timezone.utc)
+        dt = latest_candle['timestamp']
         
         last_datapoint_id = self.next_datapoint_id - 1
-        start_ts = latest_candle.get('start_time', dt)
-        end_ts = latest_candle.get('end_time', dt)
+        start_ts = latest_candle['start_time']
+        end_ts = latest_candle['end_time']
         datapoint_id = self.get_datapoint_id(start_ts, end_ts)
         
         newResult = last_datapoint_id != datapoint_id
         if newResult:
-            self.historical_prices.append(close_price)
-        else:
-            self.historical_prices[-1] = close_price  # Update the last price if same datapoint_id
+            # The previous bar is complete, so its EMAs are the base for every update to this one
+            self.bar_start_fast_ema = self.previous_fast_ema
+            self.bar_start_slow_ema = self.previous_slow_ema
+
+        # Datapoint ids count bars from 1, so they double as the warm-up counter
+        if datapoint_id <= period:
+            # Not enough data to calculate EMA
+            logger.debug("Not enough historical prices to calculate EMA. Need more than %s prices.", period)
+            valid_ema = False
 
         if valid_ema:            
-            # Recalculate EMA
-            latest_ema = self._calculate_ema()
+            # Recalculate MACD
+            latest_ema = self._calculate_macd(close_price)
             
-            if self.previous_ema != None:
-                if latest_ema > self.previous_ema:
-                    logger.debug(f"EMA increased from {self.previous_ema } to {latest_ema}")
+            if previous_macd is not None:
+                if latest_ema > previous_macd:
                     color = self.up_color
-                elif latest_ema < self.previous_ema:
-                    logger.debug(f"EMA decreased from {self.previous_ema } to {latest_ema}")
+                elif latest_ema < previous_macd:
                     color = self.down_color
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("MACD changed from %s to %s", previous_macd, latest_ema)
 
-            self.previous_ema  = latest_ema            
-            logger.debug(f"Calculated EMA: {latest_ema} for period {self.fast_ema_period}")
+            self.previous_macd = latest_ema
+            logger.debug("Calculated MACD: %s for periods %s-%s", latest_ema, self.fast_ema_period, period)
 
         else:
-            logger.warning(f"Invalid EMA value. Default color and close price will be used.")
+            logger.debug("Invalid EMA value. Default color and close price will be used.")
 
         # Return the indicator data
-        result = {
-            'label': f"MACD({self.fast_ema_period}-{self.slow_ema_period})",
-            'timestamp': dt,
-            'type': 2,  # LINE
-            'value': latest_ema,
-            'r': color[0],
-            'g': color[1],
-            'b': color[2],
-            'start_time': start_ts,
-            'end_time': end_ts,
-            'dataPointId': datapoint_id
-        }
-
-        if last_datapoint_id <= 0 or newResult or valid_ema:
-            self.historical_results.append(result)
-            logger.debug(f"New EMA result added: {result}")
+        result = IndicatorPoint(label=self._label, timestamp=dt, value=latest_ema,
+                                r=color[0], g=color[1], b=color[2],
+                                start_time=start_ts, end_time=end_ts, dataPointId=datapoint_id)
 
         return result
 # Create an instance of the indicator for the module
-indicator = EMAIndicator()
+indicator = MACDIndicator()
 
 # Expose the methods at the module level for backward compatibility
 get_options_schema = indicator.get_options_schema
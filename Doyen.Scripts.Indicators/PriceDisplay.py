@@ -1,48 +1,79 @@
-import datetime
 import json
 import logging
-from typing import Dict, List, Optional, Any
-from Indicator import Indicator
+from typing import Dict, List, Optional, Any, Union, Tuple
+from Indicator import CandleIndicator, IndicatorPoint, CandlestickPoint, BarPoint
 
 logger = logging.getLogger(__name__)
 
-class PriceDisplayIndicator(Indicator):
+# One result builder per display mode, each taking the candle, its (r, g, b) color and datapoint id.
+# Any mode not listed in _MODE_POINTS is drawn as candlesticks.
+def _bar_point(candle, color, datapoint_id):
+    open_price = candle['open']
+    close_price = candle['close']
+    if close_price >= open_price:
+        bottom, top = open_price, close_price
+    else:
+        bottom, top = close_price, open_price
+    return BarPoint(label='bardata', timestamp=candle['timestamp'], bottom=bottom, top=top,
+                    r=color[0], g=color[1], b=color[2], dataPointId=datapoint_id)
+
+def _line_point(candle, color, datapoint_id):
+    return IndicatorPoint(label='linedata', timestamp=candle['timestamp'], value=candle['close'],
+                          r=color[0], g=color[1], b=color[2], dataPointId=datapoint_id)
+
+def _candle_point(candle, color, datapoint_id):
+    return CandlestickPoint(label='candledata', timestamp=candle['timestamp'],
+                            open=candle['open'], high=candle['high'], low=candle['low'], close=candle['close'],
+                            r=color[0], g=color[1], b=color[2], dataPointId=datapoint_id)
+
+_MODE_POINTS = {
+    "bar": _bar_point,
+    "line": _line_point,
+    "candlestick": _candle_point
+}
+
+_PRICE_DISPLAY_SCHEMA = json.dumps({
+    "title": "Price Display",
+    "description": "Simple indicator to display price data",
+    "properties": {
+        "displayMode": {
+            "title": "Display Mode",
+            "description": "How to display the price data",
+            "type": "string",
+            "options": "candlestick, bar, line",
+            "value": "candlestick"
+        },
+        "upColor": {
+            "title": "Up Color",
+            "description": "Color for price increases",
+            "type": "string",
+            "options": "R, G, B: (0..255, 0..255, 0..255)",
+            "value": "0, 255, 0"
+        },
+        "downColor": {
+            "title": "Down Color",
+            "description": "Color for price decreases",
+            "type": "string",
+            "options": "R, G, B: (0..255, 0..255, 0..255)",
+            "value": "255, 0, 0"
+        }
+    }
+})
+
+class PriceDisplayIndicator(CandleIndicator):
     """Indicator for displaying price data as candlesticks or bars"""
+    # Results mix candlestick, bar and line points, so they are kept as a plain list
+    history_class = list
+
     def __init__(self):
         super().__init__("Price Display")
         self.display_mode = "candlestick"  # Options: "candlestick" or "bar" or "line"
         self.up_color = (0, 255, 0)
         self.down_color = (255, 0, 0)
+        self._bind_point_builder()
 
     def get_options_schema(self) -> str:
-        schema = {
-            "title": self.name,
-            "description": "Simple indicator to display price data",
-            "properties": {
-                "displayMode": {
-                    "title": "Display Mode",
-                    "description": "How to display the price data",
-                    "type": "string",
-                    "options": "candlestick, bar, line",
-                    "value": "candlestick"
-                },
-                "upColor": {
-                    "title": "Up Color",
-                    "description": "Color for price increases",
-                    "type": "string",
-                    "options": "R, G, B: (0..255, 0..255, 0..255)",
-                    "value": "0, 255, 0"
-                },
-                "downColor": {
-                    "title": "Down Color",
-                    "description": "Color for price decreases",
-                    "type": "string",
-                    "options": "R, G, B: (0..255, 0..255, 0..255)",
-                    "value": "255, 0, 0"
-                }
-            }
-        }
-        return json.dumps(schema)
+        return _PRICE_DISPLAY_SCHEMA
 
     def start(self, historical_data: List[Dict], options: Dict[str, Any]) -> bool:
         super().start(historical_data, options)
@@ -53,61 +84,40 @@ class PriceDisplayIndicator(Indicator):
         self.up_color = self.parse_color(props['upColor']['value'])
         self.down_color = self.parse_color(props['downColor']['value'])
         logger.info(f"Price display indicator started with mode: {self.display_mode}, up_color: {self.up_color}, down_color: {self.down_color}")
-        # Process historical data
-        for candle in historical_data:
-            result = self.process([candle])
-            if result:
-                self.historical_results.append(result)
+        self._bind_point_builder()
+        self.seed_history(historical_data)
         return True
 
+    def _seed(self, historical_data: List[Dict], keys: List[Tuple]) -> None:
+        up_color, down_color = self.up_color, self.down_color
+        make_point = self._make_point
+        self.historical_results = [
+            make_point(candle, up_color if candle['close'] >= candle['open'] else down_color, datapoint_id)
+            for datapoint_id, candle in enumerate(historical_data, 1)
+        ]
+
     def stop(self) -> None:
         super().stop()
         logger.info("PriceDisplayIndicator stopped.")
 
-    def process(self, candles: List[Dict]) -> Optional[Dict]:
-        if not candles or len(candles) == 0:
+    def _bind_point_builder(self):
+        # The display mode is fixed once started, so its result builder is looked up here
+        # instead of checking the mode on every candle. Unknown modes are drawn as candlesticks.
+        self._make_point = _MODE_POINTS.get(self.display_mode, _candle_point)
+
+    def process(self, candles: List[Dict]) -> Optional[Union[IndicatorPoint, CandlestickPoint, BarPoint]]:
+        """Process new candles, oldest first, and return the result for the last one. Results are not recorded."""
+        if not candles:
             return None
-        candle = candles[0]
-        is_up = candle['close'] >= candle['open']
-        color = self.up_color if is_up else self.down_color
-        datapoint_id = self.get_datapoint_id(candle['start_time'], candle['end_time'])
-        if self.display_mode == "bar":
-            return {
-                'label': 'bardata',
-                'timestamp': candle['timestamp'],
-                'type': 3,  # BAR
-                'bottom': min(candle['open'], candle['close']),
-                'top': max(candle['open'], candle['close']),
-                'r': color[0],
-                'g': color[1],
-                'b': color[2],
-                'dataPointId': datapoint_id
-            }
-        elif self.display_mode == "line":
-            return {
-                'label': 'linedata',
-                'timestamp': candle['timestamp'],
-                'type': 2,  # LINE
-                'value': candle['close'],
-                'r': color[0],
-                'g': color[1],
-                'b': color[2],
-                'dataPointId': datapoint_id
-            }
-        else:
-            return {
-                'label': 'candledata',
-                'timestamp': candle['timestamp'],
-                'type': 1,  # CANDLESTICK
-                'open': candle['open'],
-                'high': candle['high'],
-                'low': candle['low'],
-                'close': candle['close'],
-                'r': color[0],
-                'g': color[1],
-                'b': color[2],
-                'dataPointId': datapoint_id
-            }
+        process_candle = self._process_candle
+        for candle in candles:
+            result = process_candle(candle)
+        return result
+
+    def _process_candle(self, candle: Dict):
+        """Build the result for a single candle"""
+        color = self.up_color if candle['close'] >= candle['open'] else self.down_color
+        return self._make_point(candle, color, self.get_datapoint_id(candle['start_time'], candle['end_time']))
 
 indicator = PriceDisplayIndicator()
 get_options_schema = indicator.get_options_schema
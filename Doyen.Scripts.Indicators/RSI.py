@@ -1,26 +1,33 @@
-import datetime
-from pickle import FALSE
-from re import S
-import statistics
 import json
 import logging
 from typing import Dict, List, Optional, Any, Tuple
-from Indicator import Indicator
+from Indicator import Indicator, IndicatorPoint, LineHistory, band_color
+from _kernels import JIT_ENABLED, np, wilder_rsi
 
 logger = logging.getLogger(__name__)
 
 class RSIIndicator(Indicator):
     """Relative Strength Index indicator implementation"""
+    history_class = LineHistory
     
     def __init__(self):
         super().__init__("Relative Strength Index (RSI)")
         self.rsi_period = 14  # Default RSI period
-        self.historical_candles = []  # Store historical closing prices
+        self.seed_gains = []  # Gains and losses of the first rsi_period bars, averaged to seed Wilder's smoothing
+        self.seed_losses = []
+        self.avg_gain = None  # Most recent smoothed gain and loss
+        self.avg_loss = None
+        self.bar_start_avg_gain = None  # Averages of the last completed bar; intra-bar updates build on these
+        self.bar_start_avg_loss = None
+        self.previous_close = None  # Close of the last completed bar
+        self.last_close = None  # Latest close of the current bar
         self.upperBand = 70.0  # Default upper band
         self.lowerBand = 30.0  # Default lower band
         self.upperBand_color = (0, 255, 0)  # Default upper band color (green)
         self.lowerBand_color = (255, 0, 0) # Default lower band color (red)
         self.default_color = (128, 128, 255)
+        self._set_label()
+        self._bind_value_color()
 
     def get_options_schema(self) -> str:
         """Return JSON schema for the options panel"""
@@ -79,7 +86,14 @@ class RSIIndicator(Indicator):
         # Call the parent method to store data
         super().start(historical_data, options)
         
-        self.historical_candles = []
+        self.seed_gains = []
+        self.seed_losses = []
+        self.avg_gain = None
+        self.avg_loss = None
+        self.bar_start_avg_gain = None
+        self.bar_start_avg_loss = None
+        self.previous_close = None
+        self.last_close = None
 
         props = options['properties']
         logger.info(f"RSI indicator started with properties: {props}")
@@ -89,115 +103,146 @@ class RSIIndicator(Indicator):
         self.upperBand_color = self.parse_color(props['upperBandColor']['value'])
         self.lowerBand_color = self.parse_color(props['lowerBandColor']['value'])
         self.default_color = self.parse_color(props['defaultColor']['value'])
+        self._set_label()
+        self._bind_value_color()
         
-        # Process historical data
-        for candle in historical_data:
-            result = self.process([candle])
+        self.seed_history(historical_data)
         
         return True
 
+    def _rsi_series(self, closes: List[float]) -> Tuple[List[Optional[float]], List[Optional[float]], List[Optional[float]]]:
+        """RSI, average gain and average loss for every bar in closes, matching process().
+
+        Bars before the first rsi_period changes are complete have None for all three.
+        """
+        period = self.rsi_period
+        count = len(closes)
+        values = [None] * min(count, period)
+        avg_gains = values.copy()
+        avg_losses = values.copy()
+        if count <= period:
+            return values, avg_gains, avg_losses
+
+        if JIT_ENABLED:
+            rsi, gain_array, loss_array = wilder_rsi(np.array(closes, dtype=np.float64), period)
+            values.extend(rsi[period:].tolist())
+            avg_gains.extend(gain_array[period:].tolist())
+            avg_losses.extend(loss_array[period:].tolist())
+            return values, avg_gains, avg_losses
+
+        changes = [price - previous for previous, price in zip(closes, closes[1:])]
+        gains = [change if change > 0 else 0.0 for change in changes]
+        losses = [-change if change < 0 else 0.0 for change in changes]
+        avg_gain = sum(gains[:period]) / period
+        avg_loss = sum(losses[:period]) / period
+        calculate = self._calculate_rsi
+        for gain, loss in zip(gains[period - 1:], losses[period - 1:]):
+            if avg_gains[-1] is not None:
+                avg_gain = (avg_gain * (period - 1) + gain) / period
+                avg_loss = (avg_loss * (period - 1) + loss) / period
+            avg_gains.append(avg_gain)
+            avg_losses.append(avg_loss)
+            values.append(calculate(avg_gain, avg_loss))
+        return values, avg_gains, avg_losses
+
+    def _set_label(self):
+        """Build the result label, which only changes with the options"""
+        self._label = f"RSI({self.rsi_period})"
+
+    def _bind_value_color(self):
+        """Bind the band coloring, which only changes with the options"""
+        self._value_color = band_color(self.upperBand, self.lowerBand,
+                                       self.upperBand_color, self.lowerBand_color, self.default_color)
+
+    def _seed(self, historical_data: List[Dict], keys: List[Tuple]) -> None:
+        closes = [candle['close'] for candle in historical_data]
+        values, avg_gains, avg_losses = self._rsi_series(closes)
+        period = self.rsi_period
+        label = self._label
+        upper_band, lower_band = self.upperBand, self.lowerBand
+        upper_color, lower_color, default_color = self.upperBand_color, self.lowerBand_color, self.default_color
+
+        results = LineHistory()
+        for value, candle, key in zip(values, historical_data, keys):
+            color = default_color
+            if value is None:
+                value = 50
+            elif value >= upper_band:
+                color = upper_color
+            elif value <= lower_band:
+                color = lower_color
+            results.add(label, candle['timestamp'], value, color, key[0], key[1], len(results) + 1)
+
+        count = len(closes)
+        seed_changes = [price - previous for previous, price in zip(closes, closes[1:period + 1])]
+        self.historical_results = results
+        self.seed_gains = [change if change > 0 else 0.0 for change in seed_changes]
+        self.seed_losses = [-change if change < 0 else 0.0 for change in seed_changes]
+        self.avg_gain = avg_gains[-1] if count else None
+        self.avg_loss = avg_losses[-1] if count else None
+        self.bar_start_avg_gain = avg_gains[-2] if count > 1 else None
+        self.bar_start_avg_loss = avg_losses[-2] if count > 1 else None
+        self.previous_close = closes[-2] if count > 1 else None
+        self.last_close = closes[-1] if count else None
+
     def stop(self):
         super().stop()
         """Cleanup resources"""
         logger.info("RSIIndicator stopped.")
 
-    def _calculate_rsi(self) -> float:
-        """Calculate SMA values based on current prices"""
-        # Need at least sma_period prices to calculate SMA
-        if len(self.historical_candles) < self.rsi_period:
-            return
-
-        # Calculate RSI for each window of prices
-        window = self.historical_candles[-self.rsi_period:]
-        gains = []
-        losses = []
-        for price in window:
-            if price["open"] > price["close"]:
-                losses.append(price["open"] - price["close"])
-            elif price["close"] > price["open"]:
-                gains.append(price["close"] - price["open"])
-
-        if not gains and not losses:
-            return 0
-
-        avg_gain = statistics.mean(gains) if gains else 0
-        avg_loss = statistics.mean(losses) if losses else 0
-
-        # Calculate RSI
-        rs = avg_gain / avg_loss if avg_loss else 0
-        rsi = 100 - (100 / (1 + rs))
-        return rsi
-
-    def process(self, candles: List[Dict]) -> Optional[Dict]:
+    def _calculate_rsi(self, avg_gain: float, avg_loss: float) -> float:
+        """RSI from a smoothed gain and loss"""
+        if avg_loss == 0:
+            # No losses in the window: fully overbought, or neutral if the price did not move at all
+            return 100.0 if avg_gain > 0 else 50.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def process(self, candles: List[Dict]) -> Optional[IndicatorPoint]:
         """Process new price data and return updated indicator values"""
-        if not candles or len(candles) == 0:
+        return self.base_process(candles, self._kernel)
+
+    def _kernel(self, candle: Dict, datapoint_id: int, new_bar: bool) -> Optional[float]:
+        """Update the smoothed gain and loss with the candle's close and return the RSI, or None while seeding"""
+        close_price = candle['close']
+        period = self.rsi_period
+        if new_bar:
+            # The previous bar is complete: its close is the base for this bar's change, and its
+            # averages the base for Wilder's smoothing
+            self.previous_close = self.last_close
+            self.bar_start_avg_gain = self.avg_gain
+            self.bar_start_avg_loss = self.avg_loss
+        self.last_close = close_price
+
+        if self.previous_close is None:
+            # The first bar has no change to measure
             return None
-        
-        # Get the latest candlestick
-        latest_candle = candles[0]
-        
-        valid_rsi = True
-        latest_rsi = 50
-        color = self.default_color
-
-        # Keep only the needed history (sma_period + some extra)
-        max_history = max(self.rsi_period * 3, 100)
-        if len(self.historical_candles) > max_history:
-            self.historical_candles = self.historical_candles[-max_history:]
-        elif len(self.historical_candles) < self.rsi_period:
-            # Not enough data to calculate SMA
-            logger.warning(f"Not enough historical prices to calculate SMA. Need at least {self.rsi_period} prices.")
-            valid_rsi = False
-        
-        # Get timestamp from the candle
-        dt = latest_candle['timestamp'] or datetime.datetime.now(datetime.timezone.utc)
-        
-        last_datapoint_id = self.next_datapoint_id - 1
-        start_ts = latest_candle.get('start_time', dt)
-        end_ts = latest_candle.get('end_time', dt)
-        datapoint_id = self.get_datapoint_id(start_ts, end_ts)
-        
-        newResult = last_datapoint_id != datapoint_id
-        if newResult:
-            self.historical_candles.append(latest_candle)
+
+        change = close_price - self.previous_close
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        if self.bar_start_avg_gain is None:
+            # Still seeding: the first averages are the simple means of the first rsi_period changes
+            if new_bar or not self.seed_gains:
+                self.seed_gains.append(gain)
+                self.seed_losses.append(loss)
+            else:
+                self.seed_gains[-1] = gain  # Update the last change if same datapoint_id
+                self.seed_losses[-1] = loss
+            if len(self.seed_gains) < period:
+                logger.debug("Not enough historical prices to calculate RSI. Need at least %s prices.", period + 1)
+                return None
+            self.avg_gain = sum(self.seed_gains) / period
+            self.avg_loss = sum(self.seed_losses) / period
         else:
-            self.historical_candles[-1]["close"] = latest_candle["close"]  # Update the last candle if same datapoint_id
-
-        if valid_rsi:
-            # Recalculate SMA
-            latest_rsi = self._calculate_rsi()
-            logger.debug(f"Calculated RSI: {latest_rsi} for period {self.rsi_period}")
-            # Compare with the previous historical result's RSI value, not rsi_values array
-            if len(self.historical_results) > 0:
-                if latest_rsi >= self.upperBand:
-                    logger.debug(f"RSI {latest_rsi} exceeds upper band {self.upperBand}")
-                    color = self.upperBand_color
-                elif latest_rsi <= self.lowerBand:
-                    logger.debug(f"RSI {latest_rsi} falls below lower band {self.lowerBand}")
-                    color = self.lowerBand_color
-        
-        if valid_rsi == False:
-            logger.warning(f"Invalid RSI value. Default color and close price will be used.")
-
-        # Return the indicator data
-        result = {
-            'label': f"RSI({self.rsi_period})",
-            'timestamp': dt,
-            'type': 2,  # LINE
-            'value': latest_rsi,
-            'r': color[0],
-            'g': color[1],
-            'b': color[2],
-            'start_time': start_ts,
-            'end_time': end_ts,
-            'dataPointId': datapoint_id
-        }
+            self.avg_gain = (self.bar_start_avg_gain * (period - 1) + gain) / period
+            self.avg_loss = (self.bar_start_avg_loss * (period - 1) + loss) / period
 
-        if last_datapoint_id <= 0 or newResult or valid_rsi == False:
-            self.historical_results.append(result)
-            logger.debug(f"New SMA result added: {result}")
+        latest_rsi = self._calculate_rsi(self.avg_gain, self.avg_loss)
+        logger.debug("Calculated RSI: %s for period %s", latest_rsi, period)
+        return latest_rsi
 
-        return result
+    def _placeholder_value(self, candle: Dict) -> float:
+        return 50
 # Create an instance of the indicator for the module
 indicator = RSIIndicator()
 
@@ -1,23 +1,24 @@
-import datetime
-from pickle import FALSE
-import statistics
 import json
 import logging
+from collections import deque
 from typing import Dict, List, Optional, Any, Tuple
-from Indicator import Indicator
+from Indicator import Indicator, IndicatorPoint, LineHistory
 
 logger = logging.getLogger(__name__)
 
 class SMAIndicator(Indicator):
     """Simple Moving Average indicator implementation"""
+    history_class = LineHistory
     
     def __init__(self):
         super().__init__("Simple Moving Average (SMA)")
         self.sma_period = 30  # Default SMA period
-        self.historical_prices = []  # Store historical closing prices
+        self._window = deque(maxlen=self.sma_period)  # Closes of the last sma_period bars
+        self._window_sum = 0.0  # Running sum of _window
         self.up_color = (0, 255, 0)  # Default up color (green)
         self.down_color = (255, 0, 0) # Default down color (red)
         self.default_color = (128, 128, 255)
+        self._set_label()
 
     def get_options_schema(self) -> str:
         """Return JSON schema for the options panel"""
@@ -62,108 +63,110 @@ class SMAIndicator(Indicator):
         # Call the parent method to store data
         super().start(historical_data, options)
         
-        self.historical_prices = []
-
         props = options['properties']
         logger.info(f"SMA indicator started with properties: {props}")
         self.sma_period = props['period']['value']
+        self._window = deque(maxlen=self.sma_period)
+        self._window_sum = 0.0
         self.up_color = self.parse_color(props['upColor']['value'])
         self.down_color = self.parse_color(props['downColor']['value'])
         self.default_color = self.parse_color(props['defaultColor']['value'])
+        self._set_label()
         
-        # Process historical data
-        for candle in historical_data:
-            result = self.process([candle])
+        self.seed_history(historical_data)
         
         return True
 
+    def _set_label(self):
+        """Build the result label, which only changes with the options"""
+        self._label = f"SMA({self.sma_period})"
+
+    def _seed(self, historical_data: List[Dict], keys: List[Tuple]) -> None:
+        period = self.sma_period
+        label = self._label
+        up_color, down_color, default_color = self.up_color, self.down_color, self.default_color
+        window = deque(maxlen=period)
+        window_sum = 0.0
+
+        results = LineHistory()
+        previous = None
+        for candle, key in zip(historical_data, keys):
+            close_price = candle['close']
+            # Same order as process(): validity is decided before the bar joins the window
+            valid_sma = len(window) == period
+            if valid_sma:
+                window_sum += close_price - window[0]
+            else:
+                window_sum += close_price
+            window.append(close_price)
+
+            color = default_color
+            value = close_price
+            if valid_sma:
+                value = window_sum / period
+                if previous is not None:
+                    color = up_color if value >= previous else down_color
+            results.add(label, candle['timestamp'], value, color, key[0], key[1], len(results) + 1)
+            previous = value
+
+        self.historical_results = results
+        self._window = window
+        self._window_sum = window_sum
+
     def stop(self):
         super().stop()
         """Cleanup resources"""
         logger.info("SMAIndicator stopped.")
 
     def _calculate_sma(self) -> float:
-        """Calculate SMA values based on current prices"""
+        """Calculate the SMA from the running sum of the current window"""
         # Need at least sma_period prices to calculate SMA
-        if len(self.historical_prices) < self.sma_period:
+        if len(self._window) < self.sma_period:
             return
         
-        # Calculate SMA for each window of prices
-        window = self.historical_prices[-self.sma_period:]
-        return statistics.mean(window)
+        return self._window_sum / self.sma_period
 
-    def process(self, candles: List[Dict]) -> Optional[Dict]:
+    def process(self, candles: List[Dict]) -> Optional[IndicatorPoint]:
         """Process new price data and return updated indicator values"""
-        if not candles or len(candles) == 0:
-            return None
-        
-        # Get the latest candlestick
-        latest_candle = candles[0]
-        close_price = latest_candle['close']
-        
-        valid_sma = True
-        latest_sma = close_price
-        color = self.default_color
-
-        # Keep only the needed history (sma_period + some extra)
-        max_history = max(self.sma_period * 3, 100)
-        if len(self.historical_prices) > max_history:
-            self.historical_prices = self.historical_prices[-max_history:]
-        elif len(self.historical_prices) < self.sma_period:
+        return self.base_process(candles, self._kernel)
+
+    def _kernel(self, candle: Dict, datapoint_id: int, new_bar: bool) -> Optional[float]:
+        """Add the candle's close to the window and return the SMA, or None if the window was not yet full"""
+        close_price = candle['close']
+        period = self.sma_period
+        window = self._window
+        # Checked before the close goes in, so the first SMA is reported on the bar after the window fills
+        valid_sma = len(window) >= period
+        if not valid_sma:
             # Not enough data to calculate SMA
-            logger.warning(f"Not enough historical prices to calculate SMA. Need at least {self.sma_period} prices.")
-            valid_sma = False
-        
-        # Get timestamp from the candle
-        dt = latest_candle['timestamp'] or datetime.datetime.now(datetime.timezone.utc)
-        
-        last_datapoint_id = self.next_datapoint_id - 1
-        start_ts = latest_candle.get('start_time', dt)
-        end_ts = latest_candle.get('end_time', dt)
-        datapoint_id = self.get_datapoint_id(start_ts, end_ts)
-        
-        newResult = last_datapoint_id != datapoint_id
-        if newResult:
-            self.historical_prices.append(close_price)
+            logger.debug("Not enough historical prices to calculate SMA. Need at least %s prices.", period)
+
+        if new_bar:
+            # The deque drops the oldest close once full, so take it out of the sum first
+            if len(window) == period:
+                self._window_sum += close_price - window[0]
+            else:
+                self._window_sum += close_price
+            window.append(close_price)
         else:
-            self.historical_prices[-1] = close_price  # Update the last price if same datapoint_id
-
-        if valid_sma:
-            # Recalculate SMA
-            latest_sma = self._calculate_sma()
-            logger.debug(f"Calculated SMA: {latest_sma} for period {self.sma_period}")
-            # Compare with the previous historical result's SMA value, not sma_values array
-            if len(self.historical_results) > 0:
-                previous_sma = self.historical_results[-1]['value']
-                if latest_sma >= previous_sma:
-                    logger.debug(f"SMA increased from {previous_sma} to {latest_sma}")
-                    color = self.up_color
-                else:
-                    logger.debug(f"SMA decreased from {previous_sma} to {latest_sma}")
-                    color = self.down_color
-        
-        if valid_sma == False:
-            logger.warning(f"Invalid SMA value. Default color and close price will be used.")
-
-        # Return the indicator data
-        result = {
-            'label': f"SMA({self.sma_period})",
-            'timestamp': dt,
-            'type': 2,  # LINE
-            'value': latest_sma,
-            'r': color[0],
-            'g': color[1],
-            'b': color[2],
-            'start_time': start_ts,
-            'end_time': end_ts,
-            'dataPointId': datapoint_id
-        }
-
-        if last_datapoint_id <= 0 or newResult or valid_sma == False:
-            self.historical_results.append(result)
-            logger.debug(f"New SMA result added: {result}")
+            # Update the last price if same datapoint_id
+            self._window_sum += close_price - window[-1]
+            window[-1] = close_price
 
-        return result
+        if not valid_sma:
+            return None
+        latest_sma = self._calculate_sma()
+        logger.debug("Calculated SMA: %s for period %s", latest_sma, period)
+        return latest_sma
+
+    def _value_color(self, value: float) -> Tuple[int, int, int]:
+        """Up or down color against the previous historical result's SMA"""
+        previous_sma = self.historical_results.values[-1]
+        if value >= previous_sma:
+            logger.debug("SMA increased from %s to %s", previous_sma, value)
+            return self.up_color
+        logger.debug("SMA decreased from %s to %s", previous_sma, value)
+        return self.down_color
 # Create an instance of the indicator for the module
 indicator = SMAIndicator()
 
@@ -1,23 +1,27 @@
-import datetime
-from pickle import FALSE
-import statistics
 import json
 import logging
+from collections import deque
 from typing import Dict, List, Optional, Any, Tuple
-from Indicator import Indicator
+from Indicator import Indicator, IndicatorPoint, LineHistory, band_color
+from _kernels import JIT_ENABLED, np, stochastic_k
 
 logger = logging.getLogger(__name__)
 
 class StochasticOscillator(Indicator):
     """Stochastic Oscillator indicator implementation"""
+    history_class = LineHistory
     
     def __init__(self):
         super().__init__("Stochastic Oscillator")
         self.period = 5  # Default Stochastic period
-        self.historical_candles = []  # Store historical closing prices
+        # (datapoint id, price) pairs for the bars in the window. Lows increase and highs decrease from
+        # front to back, so the front of each is the window's lowest low / highest high.
+        self._lows = deque()
+        self._highs = deque()
         self.up_color = (0, 255, 0)  # Default up color (green)
         self.down_color = (255, 0, 0) # Default down color (red)
         self.default_color = (128, 128, 255)
+        self._set_label()
 
     def get_options_schema(self) -> str:
         """Return JSON schema for the options panel"""
@@ -76,7 +80,8 @@ class StochasticOscillator(Indicator):
         # Call the parent method to store data
         super().start(historical_data, options)
         
-        self.historical_candles = []
+        self._lows = deque()
+        self._highs = deque()
 
         props = options['properties']
         logger.info(f"Stochastic Oscillator started with properties: {props}")
@@ -86,105 +91,118 @@ class StochasticOscillator(Indicator):
         self.upperBand_color = self.parse_color(props['upperBandColor']['value'])
         self.lowerBand_color = self.parse_color(props['lowerBandColor']['value'])
         self.default_color = self.parse_color(props['defaultColor']['value'])
+        self._set_label()
+        self._bind_value_color()
         
-        # Process historical data
-        for candle in historical_data:
-            result = self.process([candle])
+        self.seed_history(historical_data)
         
         return True
 
+    def _set_label(self):
+        """Build the result label, which only changes with the options"""
+        self._label = f"Stochastic({self.period})"
+
+    def _bind_value_color(self):
+        """Bind the band coloring, which only changes with the options"""
+        self._value_color = band_color(self.upperBand, self.lowerBand,
+                                       self.upperBand_color, self.lowerBand_color, self.default_color)
+
+    def _seed(self, historical_data: List[Dict], keys: List[Tuple]) -> None:
+        period = self.period
+        label = self._label
+        upper_band, lower_band = self.upperBand, self.lowerBand
+        upper_color, lower_color, default_color = self.upperBand_color, self.lowerBand_color, self.default_color
+        push_bar = self._push_bar
+        count = len(historical_data)
+
+        if JIT_ENABLED:
+            values = stochastic_k(np.array([candle['close'] for candle in historical_data], dtype=np.float64),
+                                  np.array([candle['low'] for candle in historical_data], dtype=np.float64),
+                                  np.array([candle['high'] for candle in historical_data], dtype=np.float64),
+                                  period).tolist()
+            # Only the bars still in the window matter for the live low/high deques
+            for datapoint_id in range(max(count - period, 0) + 1, count + 1):
+                candle = historical_data[datapoint_id - 1]
+                push_bar(datapoint_id, candle['low'], candle['high'])
+        else:
+            calculate = self._calculate_stochastic
+            values = []
+            for datapoint_id, candle in enumerate(historical_data, 1):
+                push_bar(datapoint_id, candle['low'], candle['high'])
+                values.append(calculate(candle['close']) if datapoint_id >= period else None)
+
+        results = LineHistory()
+        for datapoint_id, (value, candle, key) in enumerate(zip(values, historical_data, keys), 1):
+            color = default_color
+            if datapoint_id < period:
+                value = 50
+            elif datapoint_id > 1:
+                # process() only colours a value once there is an earlier result
+                if value >= upper_band:
+                    color = upper_color
+                elif value <= lower_band:
+                    color = lower_color
+            results.add(label, candle['timestamp'], value, color, key[0], key[1], datapoint_id)
+
+        self.historical_results = results
+
     def stop(self):
         super().stop()
         """Cleanup resources"""
-        logger.info("SMAIndicator stopped.")
-
-    def _calculate_stochastic(self) -> float:
-        """Calculate SMA values based on current prices"""
-        # Need at least sma_period prices to calculate SMA
-        if len(self.historical_candles) < self.period:
-            return
-
-        # Get high and low from window
-        window = self.historical_candles[-self.period:]
-        low = min(candle['low'] for candle in window)
-        high = max(candle['high'] for candle in window)
+        logger.info("StochasticOscillator stopped.")
+
+    def _push_bar(self, datapoint_id: int, low: float, high: float):
+        """Add a new bar's low and high to the window and drop the bar that falls out of it"""
+        lows = self._lows
+        while lows and lows[-1][1] >= low:
+            lows.pop()
+        lows.append((datapoint_id, low))
+        highs = self._highs
+        while highs and highs[-1][1] <= high:
+            highs.pop()
+        highs.append((datapoint_id, high))
+
+        oldest = datapoint_id - self.period
+        while lows[0][0] <= oldest:
+            lows.popleft()
+        while highs[0][0] <= oldest:
+            highs.popleft()
+
+    def _calculate_stochastic(self, close_price: float) -> float:
+        """Calculate %K for close_price against the window's lowest low and highest high"""
+        low = self._lows[0][1]
+        high = self._highs[0][1]
 
         if high == low:
             return 0
 
         # Calculate Stochastic Oscillator
-        latest_stoch = (window[-1]['close'] - low) / (high - low) * 100
+        latest_stoch = (close_price - low) / (high - low) * 100
         return latest_stoch
 
-    def process(self, candles: List[Dict]) -> Optional[Dict]:
+    def process(self, candles: List[Dict]) -> Optional[IndicatorPoint]:
         """Process new price data and return updated indicator values"""
-        if not candles or len(candles) == 0:
+        return self.base_process(candles, self._kernel)
+
+    def _kernel(self, candle: Dict, datapoint_id: int, new_bar: bool) -> Optional[float]:
+        """Add a new bar to the window and return %K for the candle's close, or None until the window is full"""
+        period = self.period
+        if new_bar:
+            self._push_bar(datapoint_id, candle['low'], candle['high'])
+        # An update to the same datapoint only changes the close, so the window is left as is
+
+        # Datapoint ids count bars from 1, so the window is full from bar `period` on
+        if datapoint_id < period:
+            # Not enough data to calculate the oscillator
+            logger.debug("Not enough historical prices to calculate Stochastic. Need at least %s prices.", period)
             return None
-        
-        # Get the latest candlestick
-        latest_candle = candles[0]
-        valid_stoch = True
-        latest_stoch = 50
-        color = self.default_color
-
-        # Keep only the needed history (sma_period + some extra)
-        max_history = max(self.period * 3, 100)
-        if len(self.historical_candles) > max_history:
-            self.historical_candles = self.historical_candles[-max_history:]
-        elif len(self.historical_candles) < self.period:
-            # Not enough data to calculate SMA
-            logger.warning(f"Not enough historical prices to calculate SMA. Need at least {self.period} prices.")
-            valid_stoch = False
-
-        # Get timestamp from the candle
-        dt = latest_candle['timestamp'] or datetime.datetime.now(datetime.timezone.utc)
-        
-        last_datapoint_id = self.next_datapoint_id - 1
-        start_ts = latest_candle.get('start_time', dt)
-        end_ts = latest_candle.get('end_time', dt)
-        datapoint_id = self.get_datapoint_id(start_ts, end_ts)
-        
-        newResult = last_datapoint_id != datapoint_id
-        if newResult:
-            self.historical_candles.append(latest_candle)
-        else:
-            self.historical_candles[-1]["close"] = latest_candle["close"]  # Update the last candle if same datapoint_id
-
-        if valid_stoch:
-            # Recalculate Stochastic Oscillator
-            latest_stoch = self._calculate_stochastic()
-            logger.debug(f"Calculated Stochastic Oscillator: {latest_stoch} for period {self.period}")
-            # Compare with the previous historical result's Stochastic value, not rsi_values array
-            if len(self.historical_results) > 0:
-                if latest_stoch >= self.upperBand:
-                    logger.debug(f"Stochastic {latest_stoch} exceeds upper band {self.upperBand}")
-                    color = self.upperBand_color
-                elif latest_stoch <= self.lowerBand:
-                    logger.debug(f"Stochastic {latest_stoch} falls below lower band {self.lowerBand}")
-                    color = self.lowerBand_color
-        
-        if valid_stoch == False:
-            logger.warning(f"Invalid Stochastic value. Default color and close price will be used.")
-
-        # Return the indicator data
-        result = {
-            'label': f"Stochastic({self.period})",
-            'timestamp': dt,
-            'type': 2,  # LINE
-            'value': latest_stoch,
-            'r': color[0],
-            'g': color[1],
-            'b': color[2],
-            'start_time': start_ts,
-            'end_time': end_ts,
-            'dataPointId': datapoint_id
-        }
 
-        if last_datapoint_id <= 0 or newResult or valid_stoch == False:
-            self.historical_results.append(result)
-            logger.debug(f"New SMA result added: {result}")
+        latest_stoch = self._calculate_stochastic(candle['close'])
+        logger.debug("Calculated Stochastic Oscillator: %s for period %s", latest_stoch, period)
+        return latest_stoch
 
-        return result
+    def _placeholder_value(self, candle: Dict) -> float:
+        return 50
 # Create an instance of the indicator for the module
 indicator = StochasticOscillator()
 
@@ -0,0 +1,45 @@
+"""Exponential moving average kernels shared by the EMA and MACD indicators.
+
+ema_array is compiled with Numba when it is installed and runs as plain Python otherwise. The
+per-candle steps stay plain Python: calling into a compiled function costs more than their arithmetic.
+This module also owns the optional NumPy and Numba imports; indicators only use np when JIT_ENABLED.
+"""
+try:
+    import numpy as np
+except ImportError:
+    # Numba requires NumPy, so without it JIT_ENABLED is False as well
+    np = None
+
+try:
+    from numba import njit
+    JIT_ENABLED = True
+except ImportError:
+    JIT_ENABLED = False
+
+    def njit(*args, **kwargs):
+        # Stand-in decorator: usable both bare (@njit) and with options (@njit(cache=True))
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+def ema_step(price, prev_ema, k, one_minus_k):
+    """Advance an EMA by one price, where k is the weight of the new price"""
+    return price * k + prev_ema * one_minus_k
+
+
+def macd_step(price, prev_fast, prev_slow, k_fast, one_minus_k_fast, k_slow, one_minus_k_slow):
+    """Advance the fast and slow EMAs of a MACD by one price"""
+    return price * k_fast + prev_fast * one_minus_k_fast, price * k_slow + prev_slow * one_minus_k_slow
+
+
+@njit(cache=True)
+def ema_array(closes, k, seed):
+    """EMA after each of closes, starting from seed. closes is a float64 NumPy array."""
+    out = closes.copy()
+    ema = seed
+    one_minus_k = 1.0 - k
+    for i in range(closes.shape[0]):
+        ema = closes[i] * k + ema * one_minus_k
+        out[i] = ema
+    return out
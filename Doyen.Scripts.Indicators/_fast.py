@@ -0,0 +1,105 @@
+"""Per-candle conversion helpers used by the indicator script manager.
+
+These run once for every candle and every indicator result, so they live on their own where
+they can be compiled without touching the rest of the manager. The module is plain Python and
+works as is; to build it as an extension run `cythonize -i _fast.py` (or `mypyc _fast.py`) in
+this directory. Python imports the compiled module ahead of _fast.py whenever it is present.
+"""
+import datetime
+from google.protobuf.timestamp_pb2 import Timestamp
+
+import charts_pb2
+
+def timestamp_to_datetime(timestamp) -> datetime.datetime:
+    """Convert protobuf Timestamp to Python datetime"""
+    return datetime.datetime.fromtimestamp(
+        timestamp.seconds + timestamp.nanos / 1e9, 
+        tz=datetime.timezone.utc
+    )
+
+def candlestick_to_dict(cs) -> dict:
+    """Convert protobuf DoyenCandlestick to Python dict"""
+    return {
+        'exchange': cs.exchange,
+        'timeframe': cs.timeframe,
+        'timestamp': timestamp_to_datetime(cs.timestamp),
+        'start_time': timestamp_to_datetime(cs.timeStart),
+        'end_time': timestamp_to_datetime(cs.timeEnd),
+        'open': cs.open,
+        'high': cs.high,
+        'low': cs.low,
+        'close': cs.close
+    }
+
+def datetime_to_timestamp(dt: datetime.datetime) -> Timestamp:
+    """Convert Python datetime to protobuf Timestamp"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return Timestamp(seconds=int(dt.timestamp()), nanos=dt.microsecond * 1000)
+
+def _build_line(result: dict) -> dict:
+    return {'lineMessage': charts_pb2.IndicatorLine(value=float(result.get('value', 0)))}
+
+def _build_candlestick(result: dict) -> dict:
+    return {'candlestickMessage': charts_pb2.IndicatorCandlestick(
+        open=float(result.get('open', 0)),
+        high=float(result.get('high', 0)),
+        low=float(result.get('low', 0)),
+        close=float(result.get('close', 0))
+    )}
+
+def _build_bar(result: dict) -> dict:
+    return {'barMessage': charts_pb2.IndicatorBar(
+        bottom=float(result.get('bottom', 0)),
+        top=float(result.get('top', 0))
+    )}
+
+# Message type -> builder returning the IndicatorData keyword argument for that type's sub-message.
+# The enum values are the plain ints indicators put in result['type'] (1, 2, 3).
+_TYPE_BUILDERS = {
+    charts_pb2.IndicatorMessageType.MESSAGE_CANDLESTICK: _build_candlestick,
+    charts_pb2.IndicatorMessageType.MESSAGE_LINE: _build_line,
+    charts_pb2.IndicatorMessageType.MESSAGE_BAR: _build_bar
+}
+
+# Result keys passed through to IndicatorData unchanged when present
+_COLOR_FIELDS = ('r', 'g', 'b')
+
+def _indicator_data_fields(result: dict, start_ts: Timestamp, end_ts: Timestamp) -> dict:
+    """Build the IndicatorData constructor kwargs for an indicator result.
+
+    result is a dict or one of the Indicator point classes, which support the same get/[]/in reads.
+
+    start_ts and end_ts are protobuf Timestamps for the candle the result belongs to.
+    Shared by the historical and live paths so both produce identical messages. Every field,
+    sub-messages included, goes through the IndicatorData constructor; nothing is set afterwards.
+    """
+    msg_type = result.get('type', charts_pb2.IndicatorMessageType.MESSAGE_LINE)
+    fields = {
+        'label': result.get('label', ''),
+        'type': msg_type,
+        'startTimestamp': start_ts,
+        'endTimestamp': end_ts
+    }
+
+    # Set dataPointId if present
+    if 'dataPointId' in result:
+        fields['dataPointId'] = int(result['dataPointId'])
+
+    # Set timestamp if provided
+    if 'timestamp' in result:
+        if isinstance(result['timestamp'], datetime.datetime):
+            fields['timestamp'] = datetime_to_timestamp(result['timestamp'])
+        else:
+            # Assume timestamp is in milliseconds since epoch
+            dt = datetime.datetime.fromtimestamp(result['timestamp'] / 1000, tz=datetime.timezone.utc)
+            fields['timestamp'] = datetime_to_timestamp(dt)
+
+    # Copy RGB values that are provided; absent ones are left out so the message keeps its defaults
+    fields.update({key: result[key] for key in _COLOR_FIELDS if key in result})
+
+    # Set the appropriate message based on type
+    builder = _TYPE_BUILDERS.get(msg_type)
+    if builder:
+        fields.update(builder(result))
+    return fields
@@ -0,0 +1,71 @@
+"""Warm-up kernels for the RSI and Stochastic Oscillator indicators.
+
+Like _ema_core, these are compiled with Numba when it is installed. Indicators only call them when
+JIT_ENABLED is set and keep their plain Python loops otherwise, since interpreted loops over NumPy
+arrays are slower than loops over lists. Arguments are float64 NumPy arrays.
+"""
+from _ema_core import JIT_ENABLED, njit, np
+
+
+@njit(cache=True)
+def wilder_rsi(closes, period):
+    """RSI and Wilder-smoothed average gain and loss after each close.
+
+    The first averages are the simple means of the first `period` close-to-close changes, so
+    entries before index `period` are NaN.
+    """
+    n = closes.shape[0]
+    rsi = np.full(n, np.nan)
+    avg_gains = np.full(n, np.nan)
+    avg_losses = np.full(n, np.nan)
+    if n <= period:
+        return rsi, avg_gains, avg_losses
+
+    gain_sum = 0.0
+    loss_sum = 0.0
+    for i in range(1, period + 1):
+        change = closes[i] - closes[i - 1]
+        if change > 0:
+            gain_sum += change
+        elif change < 0:
+            loss_sum -= change
+    avg_gain = gain_sum / period
+    avg_loss = loss_sum / period
+
+    for i in range(period, n):
+        if i > period:
+            change = closes[i] - closes[i - 1]
+            gain = change if change > 0 else 0.0
+            loss = -change if change < 0 else 0.0
+            avg_gain = (avg_gain * (period - 1) + gain) / period
+            avg_loss = (avg_loss * (period - 1) + loss) / period
+        avg_gains[i] = avg_gain
+        avg_losses[i] = avg_loss
+        if avg_loss == 0.0:
+            rsi[i] = 100.0 if avg_gain > 0 else 50.0
+        else:
+            rsi[i] = 100.0 - (100.0 / (1.0 + avg_gain / avg_loss))
+    return rsi, avg_gains, avg_losses
+
+
+@njit(cache=True)
+def stochastic_k(closes, lows, highs, period):
+    """%K of each close against the lowest low and highest high of the `period` bars ending there.
+
+    Entries before the first full window (index period - 1) are NaN. A flat window gives 0.
+    """
+    n = closes.shape[0]
+    out = np.full(n, np.nan)
+    for i in range(period - 1, n):
+        low = lows[i]
+        high = highs[i]
+        for j in range(i - period + 1, i):
+            if lows[j] < low:
+                low = lows[j]
+            if highs[j] > high:
+                high = highs[j]
+        if high == low:
+            out[i] = 0.0
+        else:
+            out[i] = (closes[i] - low) / (high - low) * 100
+    return out
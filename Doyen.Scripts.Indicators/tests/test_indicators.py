@@ -0,0 +1,88 @@
+"""Tests for the indicator scripts. Run from Doyen.Scripts.Indicators with: python -m unittest discover tests"""
+import datetime
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RSI import RSIIndicator
+from SMA import SMAIndicator
+from StochasticOscillator import StochasticOscillator
+
+_START = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+_BAR = datetime.timedelta(minutes=5)
+
+def make_candle(bar: int, close: float) -> dict:
+    start = _START + bar * _BAR
+    return {
+        'timestamp': start + _BAR / 2,
+        'start_time': start,
+        'end_time': start + _BAR,
+        'open': close - 0.5,
+        'high': close + 1.0,
+        'low': close - 1.0,
+        'close': close
+    }
+
+def make_history(count: int) -> list:
+    return [make_candle(bar, 100 + (bar * 7) % 11 - bar % 3) for bar in range(count)]
+
+def default_options(indicator) -> dict:
+    return json.loads(indicator.get_options_schema())
+
+class BatchProcessTests(unittest.TestCase):
+    """process() applies every candle of a batch, matching one call per candle"""
+
+    INDICATORS = (SMAIndicator, RSIIndicator, StochasticOscillator)
+
+    def _live_candles(self):
+        # Two new bars, each followed by an intra-bar update
+        return [make_candle(60, 104.0), make_candle(60, 105.5), make_candle(61, 101.0), make_candle(61, 99.5)]
+
+    def test_batch_matches_sequential(self):
+        for cls in self.INDICATORS:
+            with self.subTest(indicator=cls.__name__):
+                sequential = cls()
+                sequential.start(make_history(60), default_options(sequential))
+                batched = cls()
+                batched.start(make_history(60), default_options(batched))
+
+                candles = self._live_candles()
+                for candle in candles:
+                    expected = sequential.process([candle])
+                result = batched.process(candles)
+
+                self.assertEqual(result, expected)
+                self.assertEqual(result.dataPointId, 62)
+                self.assertEqual(result.start_time, candles[-1]['start_time'])
+                self.assertEqual(list(batched.get_historical_results()), list(sequential.get_historical_results()))
+
+    def test_empty_batch(self):
+        for cls in self.INDICATORS:
+            with self.subTest(indicator=cls.__name__):
+                indicator = cls()
+                indicator.start(make_history(10), default_options(indicator))
+                self.assertIsNone(indicator.process([]))
+
+class LineHistoryColorTests(unittest.TestCase):
+    """Colors outside 0..255 from the options pass through to the results unchanged"""
+
+    def test_out_of_range_color(self):
+        indicator = SMAIndicator()
+        options = default_options(indicator)
+        options['properties']['period']['value'] = 3
+        options['properties']['defaultColor']['value'] = "300, -5, 256"
+        options['properties']['upColor']['value'] = "-1, 1000, 0"
+        history = make_history(2)
+        indicator.start(history, options)
+        indicator.process([make_candle(2, 100.0)])
+        indicator.process([make_candle(3, 200.0), make_candle(4, 300.0)])
+
+        results = list(indicator.get_historical_results())
+        self.assertEqual((results[0].r, results[0].g, results[0].b), (300, -5, 256))
+        self.assertEqual((results[-1].r, results[-1].g, results[-1].b), (-1, 1000, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,56 +3,76 @@ import os.path
 import shutil
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+def proto_outputs(proto: Path, output_dir: Path):
+    """Generated files for a .proto file"""
+    return [output_dir / f"{proto.stem}_pb2.py", output_dir / f"{proto.stem}_pb2_grpc.py"]
+
+def is_stale(proto: Path, outputs):
+    """True if any of the files generated from proto is missing or older than it"""
+    proto_mtime = proto.stat().st_mtime
+    for output in outputs:
+        if not output.exists() or output.stat().st_mtime < proto_mtime:
+            return True
+    return False
+
+def run_protoc(args, current_dir):
+    """Run protoc from grpcio-tools with the solution root as proto_path"""
+    cmd = [sys.executable, "-m", "grpc_tools.protoc", f"--proto_path={current_dir}", *args]
+    print(f"Executing: {' '.join(cmd)}")
+    return subprocess.run(cmd, capture_output=True, text=True, cwd=current_dir)
 
 def compile_protos():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
+    current_dir = Path(__file__).resolve().parent
     
     # Output directory for generated Python files
-    output_dir = os.path.join(current_dir, "generated")
-
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    output_dir = current_dir / "generated"
+    output_dir.mkdir(parents=True, exist_ok=True)
     
     # Verify paths
     print(f"Solution root: {current_dir}")
     print(f"Output directory: {output_dir}")
     
-    # Run the protoc compiler with grpcio-tools
-    # Use solution root as proto_path so imports work correctly
-    cmd = [
-        sys.executable,
-        "-m",
-        "grpc_tools.protoc",
-        f"--proto_path={current_dir}",
-        f"--python_out={output_dir}",
-        f"--grpc_python_out={output_dir}",
-        "-odescriptor.pb",
-        "*.proto"
-    ]
-    
-    print(f"Executing: {' '.join(cmd)}")
-    
-    # Add error output capture
-    result = subprocess.run(cmd, capture_output=True, text=True, cwd=current_dir)
-    
-    if result.returncode == 0:
+    # Expand the file list here: protoc does not glob, so a literal "*.proto" argument never matches anything
+    protos = sorted(current_dir.glob("*.proto"))
+    stale = [proto for proto in protos if is_stale(proto, proto_outputs(proto, output_dir))]
+    # The descriptor set is built from every file, so it is stale if it is older than any of them
+    descriptor = current_dir / "descriptor.pb"
+    descriptor_stale = any(is_stale(proto, [descriptor]) for proto in protos)
+
+    if stale or descriptor_stale:
+        # Each stale file gets its own protoc run; the descriptor set used by sabledocs covers every file,
+        # so it is rebuilt alongside them whenever anything changed
+        jobs = [[f"--python_out={output_dir}", f"--grpc_python_out={output_dir}", proto.name] for proto in stale]
+        jobs.append(["-odescriptor.pb", *(proto.name for proto in protos)])
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            results = list(executor.map(lambda args: run_protoc(args, current_dir), jobs))
+
+        failed = [result for result in results if result.returncode != 0]
+        if failed:
+            for result in failed:
+                print(f"Proto compilation failed with code {result.returncode}")
+                print(f"Error output: {result.stderr}")
+                if result.stdout:
+                    print(f"Output: {result.stdout}")
+            return False
+
         print(f"Proto compilation successful for {current_dir}!")
         build_docs(output_dir)
-        algosPath = os.path.join("../", "Doyen.Scripts.Algorithms")
-        print(f"Distributing algos files to {algosPath}")
-        distribute_protos("generated", "algos", algosPath)
-        distribute_protos("generated", "common", algosPath)
-        indicatorsPath = os.path.join("../", "Doyen.Scripts.Indicators")
-        print(f"Distributing indicators files to {indicatorsPath}")
-        distribute_protos("generated", "charts", indicatorsPath)
-        distribute_protos("generated", "common", indicatorsPath)
-        return True
     else:
-        print(f"Proto compilation failed with code {result.returncode}")
-        print(f"Error output: {result.stderr}")
-        if result.stdout:
-            print(f"Output: {result.stdout}")
-        return False
+        print(f"Generated files are up to date for {current_dir}, skipping protoc.")
+
+    algosPath = os.path.join("../", "Doyen.Scripts.Algorithms")
+    print(f"Distributing algos files to {algosPath}")
+    distribute_protos("generated", "algos", algosPath)
+    distribute_protos("generated", "common", algosPath)
+    indicatorsPath = os.path.join("../", "Doyen.Scripts.Indicators")
+    print(f"Distributing indicators files to {indicatorsPath}")
+    distribute_protos("generated", "charts", indicatorsPath)
+    distribute_protos("generated", "common", indicatorsPath)
+    return True
 
 def distribute_protos(src, fltr, dst):
     """Distribute generated protos to the specified path"""
@@ -63,12 +83,21 @@ def distribute_protos(src, fltr, dst):
                 src_file = os.path.join(src, file)
                 dst_file = os.path.join(dst, file)
                 if not os.path.exists(dst_file) or not os.path.samefile(src_file, dst_file):
-                    print(f"Copying {src_file} to {dst_file}")
-                    shutil.copy(src_file, dst_file)
+                    print(f"Linking {src_file} to {dst_file}")
+                    link_or_copy(src_file, dst_file)
     except:
         print(f"Failed to distribute protos from {src} to {dst}.")
         return False
 
+def link_or_copy(src_file, dst_file):
+    """Hard link dst_file to src_file, copying instead where the two are on different filesystems"""
+    if os.path.exists(dst_file):
+        os.remove(dst_file)
+    try:
+        os.link(src_file, dst_file)
+    except OSError:
+        shutil.copy(src_file, dst_file)
+
 def build_docs(path):
     """Try to build documentation using sabledocs if available"""
     try: